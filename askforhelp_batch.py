@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch Mode for AskForHelp Chatbot
+
+Answers a JSONL file of questions without the window, through the same
+routing, prompt and options path as the chatbot (ChatbotEngine.query_ai).
+Used to pre-generate answers to recurring issues for review and to
+regression-test prompt and model changes.
+
+Input: one JSON object per line with "question" and an optional "id"
+(defaults to the line number), e.g.
+    {"id": "printer-offline", "question": "The printer says it is offline."}
+
+Output: one JSON object per answered question, written as soon as it is
+done: id, question, answer, status ("ok" or "failed"), error and the
+request metrics (model, queue wait, time to first token, total time,
+Ollama's timings...).
+
+The run can be interrupted (Ctrl+C) and started again with the same output
+file: questions that already have an "ok" answer are skipped, failed ones
+are tried again.
+
+A small pool of workers keeps the server busy; the request scheduler still
+sends at most MAX_CONCURRENT_REQUESTS to Ollama at once (the default pool
+size). While the circuit breaker reports the server as unreachable (or its
+trial request is testing the server), workers wait and try their question
+again instead of producing offline answers.
+
+Usage:
+    python askforhelp_batch.py questions.jsonl [--output answers.jsonl]
+        [--workers 2] [--rules] [--use-cache] [--limit 100]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import model_config
+from chatbot_engine import ChatbotEngine
+from ollama_client import RequestHandle
+
+
+# Answer sources that count as a failure (tried again on the next run)
+FAILED_SOURCES = ("error", "offline")
+
+# How often waiting workers check whether the circuit breaker's trial request has finished
+TRIAL_POLL_SECONDS = 0.5
+
+
+def read_questions(path):
+    """(id, question) pairs of a JSONL input file"""
+    items = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            items.append((str(item.get("id", number)), item["question"]))
+    return items
+
+
+def read_finished_ids(path):
+    """Ids that already have a successful answer in an output file"""
+    finished = set()
+    if not os.path.exists(path):
+        return finished
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Last line cut off by an interruption
+                continue
+            if record.get("status") == "ok":
+                finished.add(record["id"])
+    return finished
+
+
+def get_output_metrics(metrics):
+    """Request metrics for the output file (rounded, without the timestamp)"""
+    return {name: round(value, 1) if isinstance(value, float) else value
+            for name, value in metrics.values.items() if name != "timestamp"}
+
+
+class BatchRunner:
+    """Answers questions on a pool of worker threads and appends the results"""
+
+    def __init__(self, engine, output_path, workers, use_rules=False):
+        self.engine = engine
+        self.output_path = output_path
+        self.workers = workers
+        self.use_rules = use_rules
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.in_flight = set()
+        self.errors = {}
+        self.counts = {"ok": 0, "failed": 0}
+        self.total = 0
+        self.output = None
+
+        # query_ai reports errors as events; keep the message of each request
+        engine.subscribe(self.on_engine_event)
+
+    def on_engine_event(self, event, data):
+        """Remember error messages by request handle"""
+        if event == "error":
+            self.errors[data["handle"]] = data["message"]
+
+    def wait_for_server(self):
+        """Wait while the circuit breaker says Ollama is unreachable; False if stopped
+
+        Also waits while its trial request is testing the server, which would
+        fail the other workers' requests at once.
+        """
+        breaker = self.engine.breaker
+        while breaker is not None:
+            if breaker.retry_in() > 0:
+                print(f"AI server unreachable, retrying in {breaker.retry_in():.0f}s...", file=sys.stderr)
+                wait = breaker.retry_in()
+            elif breaker.trial_in_progress():
+                wait = TRIAL_POLL_SECONDS
+            else:
+                break
+            if self.stop_event.wait(wait):
+                return False
+        return not self.stop_event.is_set()
+
+    def answer(self, question_id, question):
+        """Answer one question; returns the output record, or None if it was cancelled"""
+        if self.use_rules:
+            rule_response, metrics = self.engine.answer_from_rules(question)
+            if rule_response:
+                self.engine.record_request(metrics, rule_response)
+                return self.make_record(question_id, question, rule_response, metrics)
+
+        handle = RequestHandle()
+        with self.lock:
+            self.in_flight.add(handle)
+        try:
+            answer, metrics = self.engine.query_ai(question, [], handle)
+        finally:
+            with self.lock:
+                self.in_flight.discard(handle)
+
+        if metrics.values["source"] == "cancelled":
+            return None
+        return self.make_record(question_id, question, answer, metrics, self.errors.pop(handle, None))
+
+    def make_record(self, question_id, question, answer, metrics, error=None):
+        """One line of the output file"""
+        failed = metrics.values["source"] in FAILED_SOURCES
+        if failed and error is None:
+            error = "AI server unreachable" if metrics.values["source"] == "offline" else "unknown error"
+        return {
+            "id": question_id,
+            "question": question,
+            "answer": answer,
+            "status": "failed" if failed else "ok",
+            "error": error,
+            "metrics": get_output_metrics(metrics),
+        }
+
+    def write(self, record):
+        """Append a record and flush it, so an interruption loses nothing already answered"""
+        with self.lock:
+            self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.output.flush()
+            self.counts[record["status"]] += 1
+            done = self.counts["ok"] + self.counts["failed"]
+        status = record["status"] if record["error"] is None else f"{record['status']} ({record['error']})"
+        print(f"[{done}/{self.total}] {record['id']}: {status}, "
+              f"{record['metrics'].get('total_ms', 0) / 1000:.1f}s", file=sys.stderr)
+
+    def work(self, items):
+        """Worker thread: take the next question until there are none left"""
+        item = None
+        while self.wait_for_server():
+            if item is None:
+                with self.lock:
+                    item = next(items, None)
+                if item is None:
+                    return
+
+            # Keep a question that found the server unreachable and try it
+            # again once the circuit breaker lets requests through
+            record = self.answer(*item)
+            if record is not None and record["metrics"]["source"] == "offline" and self.engine.breaker is not None:
+                continue
+            if record is not None:
+                self.write(record)
+            item = None
+
+    def open_output(self):
+        """Open the output file for appending (after a line cut off by an interruption)"""
+        needs_newline = False
+        if os.path.exists(self.output_path) and os.path.getsize(self.output_path) > 0:
+            with open(self.output_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+
+        self.output = open(self.output_path, 'a', encoding='utf-8')
+        if needs_newline:
+            self.output.write("\n")
+
+    def run(self, items):
+        """Answer all items; Ctrl+C stops the workers and cancels requests in flight"""
+        self.total = len(items)
+        items = iter(items)
+        threads = [threading.Thread(target=self.work, args=(items,)) for _ in range(self.workers)]
+
+        self.open_output()
+        try:
+            for thread in threads:
+                thread.daemon = True
+                thread.start()
+
+            # join() with a timeout so Ctrl+C is noticed
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+            return True
+        except KeyboardInterrupt:
+            print("Stopping, run the same command again to continue...", file=sys.stderr)
+            self.stop_event.set()
+            with self.lock:
+                handles = list(self.in_flight)
+            for handle in handles:
+                handle.cancel()
+            for thread in threads:
+                thread.join()
+            return False
+        finally:
+            self.output.close()
+
+
+def print_summary(runner, elapsed):
+    """Counts, throughput and latency percentiles of this run"""
+    done = runner.counts["ok"] + runner.counts["failed"]
+    print(f"Answered {runner.counts['ok']}, failed {runner.counts['failed']} in {elapsed:.1f}s "
+          f"({done / elapsed if elapsed else 0:.2f} questions/s)", file=sys.stderr)
+    summary = runner.engine.metrics.summary(source="model")
+    for field in ("queue_wait_ms", "ttft_ms", "total_ms", "eval_tokens_per_second"):
+        stats = summary.get(field)
+        if stats:
+            print(f"  {stats['label']}: p50 {stats['p50']:.1f}, p95 {stats['p95']:.1f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions with the AskForHelp chatbot")
+    parser.add_argument("input", help="Questions, one JSON object per line with \"question\" and optional \"id\"")
+    parser.add_argument("--output", help="Answers file, appended to and resumed (default: <input>.answers.jsonl)")
+    parser.add_argument("--workers", type=int, default=model_config.MAX_CONCURRENT_REQUESTS,
+                        help="Questions answered at the same time (default: MAX_CONCURRENT_REQUESTS)")
+    parser.add_argument("--rules", action="store_true", help="Answer clear escalations from the rule templates, like the window")
+    parser.add_argument("--use-cache", action="store_true", help="Allow answers from the response caches")
+    parser.add_argument("--limit", type=int, help="Answer at most this many new questions")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.input)[0] + ".answers.jsonl"
+    items = read_questions(args.input)
+    finished = read_finished_ids(output)
+    pending = [item for item in items if item[0] not in finished]
+    already_answered = len(items) - len(pending)
+    if args.limit is not None:
+        pending = pending[:args.limit]
+    print(f"{len(items)} questions, {already_answered} already answered, "
+          f"{len(pending)} to do with {args.workers} workers -> {output}", file=sys.stderr)
+    if not pending:
+        return
+
+    engine = ChatbotEngine()
+    if not args.use_cache:
+        engine.response_cache = None
+        engine.semantic_cache = None
+
+    # Load the model before timing the first question
+    engine.get_available_models()
+    engine.warm_up_model()
+
+    runner = BatchRunner(engine, output, max(1, args.workers), use_rules=args.rules)
+    started = time.perf_counter()
+    completed = runner.run(pending)
+    print_summary(runner, time.perf_counter() - started)
+    engine.close()
+
+    if not completed:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,31 +7,21 @@ A local AI-powered chatbot to assist with IT support ticket creation
 
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox
-import requests
 import json
-import platform
-import os
-import socket
 import datetime
 import threading
-import subprocess
-import sys
+import time
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-import subprocess
-import base64
-from PIL import ImageGrab
-import io
-import model_config
-import model_behavior_config
+from ollama_client import RequestHandle
+from chatbot_engine import ChatbotEngine, EmailNotConfiguredError, SYSTEM_INFO_PLACEHOLDER
 
 
 class AskForHelpChatbot:
-    def __init__(self, root):
+    """Tkinter front end of the chatbot (the work is done by ChatbotEngine)"""
+    
+    def __init__(self, root, start_time=None, engine=None):
         self.root = root
+        self.pending_startup_tasks = 2
         
         # # Set silver 1x1 pixel icon to replace the tkinter logo
         # try:
@@ -45,152 +35,166 @@ class AskForHelpChatbot:
         self.root.iconbitmap('askforhelp_icon.ico')
         self.root.title("AskForHelp")
         
-        # System Information
-        self.system_info = self.get_system_info()
-        
-        # Ollama API Configuration (from model_config.py)
-        self.ollama_url = model_config.OLLAMA_URL
-        self.model = model_config.MODEL_NAME
-        self.available_models = []
-        self.get_available_models()
-        
-        # Model behavior configuration
-        self.model_behavior = model_behavior_config
-        
-        # Email Configuration
-        self.email_config = {
-            "smtp_server": "smtp.gmail.com",  # Change to your SMTP server
-            "smtp_port": 587,
-            "sender_email": "",  # Your email address
-            "sender_password": "",  # Your email password or app password
-            "recipient_email": "douglas.ho@hkuspace.hku.hk",  # IT support email
-            "use_tls": True
+        # Settings, Ollama servers, prompts, caches and tickets (see chatbot_engine.py)
+        self.engine = engine or ChatbotEngine(start_time=start_time)
+        self.engine.subscribe(self.on_engine_event)
+        self.event_handlers = {
+            "status": self.on_status,
+            "queue": self.on_queue_change,
+            "breaker": self.on_breaker_change,
+            "answer": self.on_answer,
+            "answer_start": self.on_answer_start,
+            "answer_token": self.on_answer_token,
+            "answer_end": self.on_answer_end,
+            "error": self.on_error,
+            "request_done": self.on_request_done,
+            "startup_task_done": self.on_startup_event,
+            "system_info": self.on_system_info_event,
         }
         
         # Chat history
         self.chat_history = []
         
+        # Streaming state (tokens are buffered by the worker thread and
+        # flushed into the chat display by the Tk main loop)
+        self.stream_lock = threading.Lock()
+        self.stream_buffer = []
+        self.stream_message = []
+        self.stream_active = False
+        self.stream_owner = None
+        self.stream_metrics = None
+        
+        # Handle of the question being answered (used by the Stop button)
+        self.current_request = None
+        
         # Create UI
         self.create_ui()
         
         # Start with welcome message
         self.show_welcome_message()
+        
+        # Runs as soon as the main loop has drawn the window
+        self.root.after(0, self.on_window_shown)
+        
+        # Load models and slow system information without blocking the window
+        self.engine.start()
     
-    def get_available_models(self):
-        """Get list of available Ollama models (for admin use)"""
-        try:
-            response = requests.get(
-                "http://localhost:11434/api/tags",
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                models = result.get('models', [])
-                self.available_models = [model['name'] for model in models]
-                
-                # Ensure current model is in the list
-                if self.model not in self.available_models and self.available_models:
-                    self.model = self.available_models[0]
-            else:
-                # Fallback to default model if API fails
-                self.available_models = [self.model]
-                
-        except Exception as e:
-            print(f"Error fetching models: {e}")
-            # Fallback to default model
-            self.available_models = [self.model]
+    @property
+    def config(self):
+        """model_config of the engine's current settings snapshot"""
+        return self.engine.config
     
-    def get_serial_number(self):
-        """Get PC serial number (Windows only)"""
-        try:
-            if platform.system() == "Windows":
-                # Get serial number using WMIC
-                result = subprocess.run(
-                    ["wmic", "bios", "get", "serialnumber"],
-                    capture_output=True,
-                    text=True,
-                    creationflags=subprocess.CREATE_NO_WINDOW
-                )
-                serial = result.stdout.strip().split('\n')[-1].strip()
-                return serial if serial and serial != "" else "Unknown"
-            else:
-                # For Linux/Mac, try different methods
-                try:
-                    # Linux
-                    result = subprocess.run(
-                        ["cat", "/sys/class/dmi/id/product_uuid"],
-                        capture_output=True,
-                        text=True
-                    )
-                    if result.returncode == 0:
-                        return result.stdout.strip()
-                except:
-                    pass
-                return "Unknown"
-        except:
-            return "Unknown"
-    
-    def capture_screenshot(self):
-        """Capture screenshot and return as base64 encoded image"""
-        try:
-            # Capture screenshot
-            screenshot = ImageGrab.grab()
-            
-            # Convert to bytes
-            img_byte_arr = io.BytesIO()
-            screenshot.save(img_byte_arr, format='PNG')
-            img_byte_arr = img_byte_arr.getvalue()
-            
-            # Encode to base64
-            img_base64 = base64.b64encode(img_byte_arr).decode('utf-8')
-            
-            return img_base64
-        except Exception as e:
-            print(f"Screenshot capture failed: {e}")
-            return None
+    @property
+    def model_behavior(self):
+        """model_behavior_config of the engine's current settings snapshot"""
+        return self.engine.model_behavior
     
-    def get_system_info(self):
-        """Collect system information for IT reports"""
-        try:
-            username = os.getlogin()
-        except:
-            username = "Unknown"
+    @property
+    def system_info(self):
+        """System information collected by the engine"""
+        return self.engine.system_info
+    
+    def on_engine_event(self, event, data):
+        """Engine listener: hand events over to the Tk main loop (called from any thread)"""
+        handler = self.event_handlers.get(event)
+        if handler is not None:
+            handler(**data)
+    
+    def on_status(self, text, idle=False, handle=None):
+        """Show an engine status message"""
+        if idle:
+            self.root.after(0, lambda: self.set_idle_status(text))
+        elif handle is not None:
+            self.run_if_active(handle, lambda: self.status_var.set(text))
+        else:
+            self.root.after(0, lambda: self.status_var.set(text))
+    
+    def on_answer(self, message, metrics=None, handle=None):
+        """Show a complete answer"""
+        self.run_if_active(handle, lambda: self.show_answer(message, metrics))
+    
+    def on_answer_start(self, metrics=None, handle=None):
+        """Start showing a streamed answer"""
+        with self.stream_lock:
+            self.stream_owner = handle
+            self.stream_metrics = metrics
+        self.run_if_active(handle, lambda: self.begin_stream_message("AskForHelp"))
+    
+    def on_answer_token(self, text, handle=None):
+        """Buffer a piece of the streamed answer (drawn by flush_stream_buffer)"""
+        self.queue_stream_text(text, handle)
+    
+    def on_answer_end(self, handle=None):
+        """Finish the streamed answer"""
+        self.run_if_active(handle, self.end_stream_message)
+    
+    def on_error(self, message, handle=None):
+        """Show an error message in the chat"""
+        self.run_if_active(handle, lambda: self.add_message("System", message, is_system=True))
+    
+    def on_request_done(self, handle=None):
+        """Re-enable input once a question has been handled"""
+        # A stopped request has already done this
+        self.run_if_active(handle, self.finish_request)
         
-        try:
-            hostname = platform.node()
-        except:
-            hostname = "Unknown"
+        # Summarize older messages off the hot path, after the answer is shown
+        self.root.after(0, lambda: self.engine.context.compact_in_background(self.chat_history))
+    
+    def on_startup_event(self, name, elapsed):
+        """A background startup task of the engine finished"""
+        self.root.after(0, lambda: self.on_startup_task_done(name, elapsed))
+    
+    def on_system_info_event(self, elapsed):
+        """The engine has collected the slow system information"""
+        self.root.after(0, lambda: self.on_system_info_loaded(elapsed))
+    
+    def on_window_shown(self):
+        """Record how long it took for the window to appear"""
+        self.engine.startup_timings["window_ms"] = self.engine.elapsed_ms(self.engine.start_time)
+    
+    def on_system_info_loaded(self, elapsed):
+        """Replace the system information placeholders (runs in the main thread)"""
+        ip_placeholder = f"IP: {SYSTEM_INFO_PLACEHOLDER}"
+        ip_text = f"IP: {self.system_info['ip_address']}"
         
-        try:
-            ip_address = socket.gethostbyname(socket.gethostname())
-        except:
-            ip_address = "Unknown"
+        self.info_var.set(self.get_info_text())
         
-        try:
-            os_info = platform.system() + " " + platform.release()
-        except:
-            os_info = "Unknown"
+        # Fill in the IP address shown in the welcome message
+        position = self.chat_display.search(ip_placeholder, "1.0", tk.END)
+        if position:
+            self.chat_display.config(state='normal')
+            self.chat_display.delete(position, f"{position}+{len(ip_placeholder)}c")
+            self.chat_display.insert(position, ip_text, ('normal',))
+            self.chat_display.config(state='disabled')
         
-        try:
-            python_version = platform.python_version()
-        except:
-            python_version = "Unknown"
+        for msg in self.chat_history:
+            if msg['is_system']:
+                msg['message'] = msg['message'].replace(ip_placeholder, ip_text)
         
-        try:
-            serial_number = self.get_serial_number()
-        except:
-            serial_number = "Unknown"
-        
-        return {
-            "username": username,
-            "hostname": hostname,
-            "ip_address": ip_address,
-            "os_info": os_info,
-            "python_version": python_version,
-            "serial_number": serial_number,
-            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+        self.on_startup_task_done("system_info_ms", elapsed)
+    
+    def on_startup_task_done(self, name, elapsed):
+        """Track background startup work and record timings once everything is loaded"""
+        timings = self.engine.startup_timings
+        timings[name] = round(elapsed * 1000, 1)
+        self.pending_startup_tasks -= 1
+        
+        if self.pending_startup_tasks == 0:
+            timings["ready_ms"] = self.engine.elapsed_ms(self.engine.start_time)
+            self.engine.record_startup_timing()
+            
+            self.set_idle_status(f"Ready (started in {timings['ready_ms'] / 1000:.1f}s)")
+    
+    def set_idle_status(self, text):
+        """Update the status bar unless a question is being answered"""
+        current = self.status_var.get()
+        if current.startswith("Ready") or current.startswith("Loading"):
+            self.status_var.set(text)
+    
+    def get_info_text(self):
+        """Text for the system information bar"""
+        return (f"User: {self.system_info['username']} | Host: {self.system_info['hostname']} | "
+                f"OS: {self.system_info['os_info']} | IP: {self.system_info['ip_address']}")
     
     def create_ui(self):
         """Create the main UI components"""
@@ -220,10 +224,10 @@ class AskForHelpChatbot:
         info_frame = tk.Frame(self.root, bg='#f0f0f0', padx=10, pady=5)
         info_frame.pack(fill='x')
         
-        info_text = f"User: {self.system_info['username']} | Host: {self.system_info['hostname']} | OS: {self.system_info['os_info']}"
+        self.info_var = tk.StringVar(value=self.get_info_text())
         info_label = tk.Label(
             info_frame,
-            text=info_text,
+            textvariable=self.info_var,
             font=('Arial', 9),
             bg='#f0f0f0',
             fg='#555555'
@@ -266,6 +270,9 @@ class AskForHelpChatbot:
         self.user_input.pack(fill='x', expand=True, padx=5, pady=5)
         self.user_input.bind('<Return>', self.send_message)
         
+        # Hidden admin shortcut
+        self.root.bind('<Control-Shift-M>', self.show_metrics_window)
+        
         submit_button = tk.Button(
             input_frame,
             text="Submit",
@@ -278,6 +285,19 @@ class AskForHelpChatbot:
         )
         submit_button.pack(side='right')
         
+        self.stop_button = tk.Button(
+            input_frame,
+            text="Stop",
+            command=self.stop_generation,
+            font=('Arial', 10, 'bold'),
+            bg='#7f8c8d',
+            fg='white',
+            activebackground='#616a6b',
+            width=8,
+            state='disabled'
+        )
+        self.stop_button.pack(side='right', padx=(0, 10))
+        
         # Button Frame
         button_frame = tk.Frame(self.root, bg='#f0f0f0', padx=10, pady=5)
         button_frame.pack(fill='x')
@@ -331,9 +351,12 @@ class AskForHelpChatbot:
         export_button.pack(side='left')
         
         # Status Bar
-        self.status_var = tk.StringVar(value="Ready")
+        status_frame = tk.Frame(self.root, bg='#e0e0e0')
+        status_frame.pack(fill='x')
+        
+        self.status_var = tk.StringVar(value="Loading...")
         status_bar = tk.Label(
-            self.root,
+            status_frame,
             textvariable=self.status_var,
             font=('Arial', 9),
             bg='#e0e0e0',
@@ -341,7 +364,20 @@ class AskForHelpChatbot:
             anchor='w',
             padx=10
         )
-        status_bar.pack(fill='x')
+        status_bar.pack(side='left', fill='x', expand=True)
+        
+        # Request queue depth and wait time (see request_scheduler.py)
+        self.queue_var = tk.StringVar(value="Queue: 0 waiting")
+        queue_label = tk.Label(
+            status_frame,
+            textvariable=self.queue_var,
+            font=('Arial', 9),
+            bg='#e0e0e0',
+            fg='#555555',
+            anchor='e',
+            padx=10
+        )
+        queue_label.pack(side='right')
     
     def show_welcome_message(self):
         """Display welcome message with instructions"""
@@ -373,10 +409,8 @@ Type your PC-related question below or click "Generate IT Ticket" to create a su
         
         self.add_message("System", welcome_msg, is_system=True)
     
-    def add_message(self, sender, message, is_system=False):
-        """Add a message to the chat display"""
-        self.chat_display.config(state='normal')
-        
+    def insert_message_header(self, sender, is_system=False):
+        """Insert the timestamped sender line for a new message"""
         if is_system:
             tag = "system"
             self.chat_display.tag_configure(tag, foreground='#2c3e50', font=('Arial', 10, 'bold'))
@@ -389,8 +423,15 @@ Type your PC-related question below or click "Generate IT Ticket" to create a su
         
         timestamp = datetime.datetime.now().strftime("%H:%M:%S")
         self.chat_display.insert(tk.END, f"\n[{timestamp}] {sender}:\n", tag)
-        self.chat_display.insert(tk.END, f"{message}\n", ('normal',))
         self.chat_display.tag_configure('normal', foreground='#333333', font=('Arial', 11))
+        return timestamp
+    
+    def add_message(self, sender, message, is_system=False):
+        """Add a message to the chat display"""
+        self.chat_display.config(state='normal')
+        
+        timestamp = self.insert_message_header(sender, is_system)
+        self.chat_display.insert(tk.END, f"{message}\n", ('normal',))
         
         self.chat_display.config(state='disabled')
         self.chat_display.see(tk.END)
@@ -403,6 +444,81 @@ Type your PC-related question below or click "Generate IT Ticket" to create a su
             "is_system": is_system
         })
     
+    def begin_stream_message(self, sender):
+        """Start a chat message whose text is filled in as tokens arrive"""
+        self.chat_display.config(state='normal')
+        self.stream_timestamp = self.insert_message_header(sender)
+        self.chat_display.config(state='disabled')
+        self.chat_display.see(tk.END)
+        
+        self.stream_sender = sender
+        self.stream_active = True
+        self.root.after(self.config.STREAM_UPDATE_INTERVAL_MS, self.flush_stream_buffer)
+    
+    def queue_stream_text(self, text, handle):
+        """Buffer streamed text from the worker thread"""
+        with self.stream_lock:
+            # Drop tokens that arrive after Stop was pressed
+            if self.stream_owner is not handle:
+                return
+            self.stream_buffer.append(text)
+            self.stream_message.append(text)
+    
+    def flush_stream_buffer(self):
+        """Draw buffered tokens into the chat display in one batch"""
+        with self.stream_lock:
+            text = "".join(self.stream_buffer)
+            self.stream_buffer = []
+        
+        if text:
+            started = time.perf_counter()
+            self.chat_display.config(state='normal')
+            self.chat_display.insert(tk.END, text, ('normal',))
+            self.chat_display.config(state='disabled')
+            self.chat_display.see(tk.END)
+            self.record_render_time(self.stream_metrics, started)
+        
+        if self.stream_active:
+            self.root.after(self.config.STREAM_UPDATE_INTERVAL_MS, self.flush_stream_buffer)
+    
+    def record_render_time(self, metrics, started):
+        """Add the time spent drawing an answer to its request metrics"""
+        if metrics is not None:
+            metrics.add("render_ms", (time.perf_counter() - started) * 1000)
+    
+    def show_answer(self, message, metrics=None):
+        """Show a complete (not streamed) answer and record how long drawing it took"""
+        started = time.perf_counter()
+        self.add_message("AskForHelp", message)
+        self.record_render_time(metrics, started)
+    
+    def end_stream_message(self):
+        """Finish the streamed message and store it in history"""
+        self.stream_active = False
+        self.flush_stream_buffer()
+        
+        with self.stream_lock:
+            message = "".join(self.stream_message)
+            self.stream_message = []
+        
+        if not message:
+            message = "No response received."
+            self.chat_display.config(state='normal')
+            self.chat_display.insert(tk.END, message, ('normal',))
+            self.chat_display.config(state='disabled')
+        
+        self.chat_display.config(state='normal')
+        self.chat_display.insert(tk.END, "\n", ('normal',))
+        self.chat_display.config(state='disabled')
+        self.chat_display.see(tk.END)
+        
+        self.chat_history.append({
+            "timestamp": self.stream_timestamp,
+            "sender": self.stream_sender,
+            "message": message,
+            "is_system": False
+        })
+    
     def send_message(self, event=None):
         """Send user message to the AI"""
         user_text = self.user_input.get().strip()
@@ -410,175 +526,174 @@ Type your PC-related question below or click "Generate IT Ticket" to create a su
             return
         
         self.user_input.delete(0, tk.END)
+        
+        # Snapshot the conversation before this question is added to it
+        self.engine.context.touch(self.chat_history)
+        history = list(self.chat_history)
         self.add_message("You", user_text)
         
+        # Clear escalations are answered instantly without the AI model
+        if self.answer_from_rules(user_text):
+            return
+        
         # Disable input during processing
         self.user_input.config(state='disabled')
+        self.stop_button.config(state='normal')
         self.status_var.set("Thinking...")
         
         # Run AI query in background thread
-        thread = threading.Thread(target=self.query_ai, args=(user_text,))
+        self.current_request = RequestHandle()
+        thread = threading.Thread(target=self.engine.query_ai, args=(user_text, history, self.current_request))
         thread.daemon = True
         thread.start()
     
-    def query_ai(self, user_message):
-        """Query the Ollama API"""
-        try:
-            # Prepare the prompt with context using model behavior configuration
-            prompt = self.model_behavior.SYSTEM_PROMPT_TEMPLATE.format(
-                username=self.system_info['username'],
-                hostname=self.system_info['hostname'],
-                os_info=self.system_info['os_info'],
-                ip_address=self.system_info['ip_address'],
-                timestamp=self.system_info['timestamp'],
-                user_message=user_message
-            )
-            
-            # Prepare the request using model behavior configuration
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": self.model_behavior.get_model_parameters()
-            }
-            
-            # Send request to Ollama
-            response = requests.post(
-                self.ollama_url,
-                json=payload,
-                headers={'Content-Type': 'application/json'},
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                ai_response = result.get('response', 'No response received.')
-                
-                # Update UI in main thread
-                self.root.after(0, lambda: self.add_message("AskForHelp", ai_response))
-                self.root.after(0, lambda: self.status_var.set("Ready"))
-            else:
-                error_msg = f"API Error: {response.status_code} - {response.text}"
-                self.root.after(0, lambda: self.add_message("System", error_msg, is_system=True))
-                self.root.after(0, lambda: self.status_var.set("Error"))
-                
-        except requests.exceptions.ConnectionError:
-            error_msg = "❌ Error: Cannot connect to Ollama. Please ensure Ollama is running on localhost:11434."
-            self.root.after(0, lambda: self.add_message("System", error_msg, is_system=True))
-            self.root.after(0, lambda: self.status_var.set("Connection Error"))
-        except Exception as e:
-            error_msg = f"❌ Error: {str(e)}"
-            self.root.after(0, lambda: self.add_message("System", error_msg, is_system=True))
-            self.root.after(0, lambda: self.status_var.set("Error"))
-        finally:
-            # Re-enable input
-            self.root.after(0, lambda: self.user_input.config(state='normal'))
-            self.root.after(0, lambda: self.user_input.focus())
+    def on_breaker_change(self, state):
+        """Show when the AI server goes offline or comes back (called from any thread)"""
+        if state == "open":
+            self.root.after(0, lambda: self.status_var.set("Offline (AI server unreachable, answering from saved responses)"))
+        elif state == "closed":
+            self.root.after(0, lambda: self.set_idle_status("Ready (AI server is back online)"))
     
-    def send_ticket_email(self, ticket_content):
-        """Send ticket via email to IT support with automatic screenshot attachment"""
-        if not self.email_config["sender_email"] or not self.email_config["sender_password"]:
-            messagebox.showerror("Email Error", 
-                "Email not configured!\n\n"
-                "Please configure your email settings:\n"
-                "1. Edit the askforhelp_chatbot.py file\n"
-                "2. Update 'sender_email' and 'sender_password' in email_config\n"
-                "3. For Gmail, use an App Password (not your regular password)")
+    def on_queue_change(self, stats):
+        """Show scheduler queue depth and wait time (called from any thread)"""
+        text = f"Queue: {stats['queued']} waiting, {stats['active']} active | Last wait: {stats['last_wait']:.1f}s"
+        self.root.after(0, lambda: self.queue_var.set(text))
+    
+    def answer_from_rules(self, user_message):
+        """Answer a clear escalation from the response templates (main thread)"""
+        rule_response, metrics = self.engine.answer_from_rules(user_message)
+        if not rule_response:
             return False
         
+        self.show_answer(rule_response, metrics)
+        self.engine.record_request(metrics, rule_response)
+        self.status_var.set(f"Ready (answered instantly, {self.engine.llm_calls_avoided} AI calls avoided)")
+        
+        if self.model_behavior.RULE_SETTINGS.get("open_ticket_dialog"):
+            self.root.after(100, self.generate_ticket)
+        return True
+    
+    def run_if_active(self, handle, callback):
+        """Run a UI update from a worker thread unless its request was stopped"""
+        self.root.after(0, lambda: None if handle.is_cancelled() else callback())
+    
+    def finish_request(self):
+        """Re-enable input after a question has been answered"""
+        self.current_request = None
+        self.stop_button.config(state='disabled')
+        self.user_input.config(state='normal')
+        self.user_input.focus()
+    
+    def stop_generation(self):
+        """Stop the answer being generated and give control back to the user"""
+        handle = self.current_request
+        if handle is None:
+            return
+        
+        # Closing the connection makes Ollama stop generating
+        handle.cancel()
+        with self.stream_lock:
+            self.stream_owner = None
+        
+        # Keep whatever was already shown
+        if self.stream_active:
+            self.end_stream_message()
+        
+        self.add_message("System", "⏹ Stopped.", is_system=True)
+        self.status_var.set("Stopped")
+        self.finish_request()
+    
+    def show_metrics_window(self, event=None):
+        """Admin view with p50/p95 request timings (Ctrl+Shift+M)"""
+        metrics_window = tk.Toplevel(self.root)
+        metrics_window.title("AskForHelp Performance Metrics")
+        metrics_window.geometry("760x560")
+        
+        text_frame = tk.Frame(metrics_window, padx=10, pady=10)
+        text_frame.pack(fill='both', expand=True)
+        
+        metrics_text = scrolledtext.ScrolledText(
+            text_frame,
+            wrap=tk.NONE,
+            font=('Courier New', 9),
+            padx=10,
+            pady=10
+        )
+        metrics_text.pack(fill='both', expand=True)
+        
+        def refresh():
+            metrics_text.config(state='normal')
+            metrics_text.delete('1.0', tk.END)
+            metrics_text.insert('1.0', self.engine.get_metrics_report())
+            metrics_text.config(state='disabled')
+        
+        def save_metrics():
+            filename = f"AskForHelp_Metrics_{self.system_info['hostname']}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+            with open(filename, 'w', encoding='utf-8') as f:
+                for record in self.engine.metrics.records():
+                    f.write(json.dumps(record) + "\n")
+            messagebox.showinfo("Saved", f"Metrics saved as {filename}", parent=metrics_window)
+        
+        button_frame = tk.Frame(metrics_window, padx=10, pady=10)
+        button_frame.pack(fill='x')
+        
+        refresh_btn = tk.Button(
+            button_frame,
+            text="Refresh",
+            command=refresh,
+            bg='#3498db',
+            fg='white',
+            font=('Arial', 10)
+        )
+        refresh_btn.pack(side='left', padx=5)
+        
+        save_btn = tk.Button(
+            button_frame,
+            text="Save to File",
+            command=save_metrics,
+            bg='#27ae60',
+            fg='white',
+            font=('Arial', 10)
+        )
+        save_btn.pack(side='left', padx=5)
+        
+        close_btn = tk.Button(
+            button_frame,
+            text="Close",
+            command=metrics_window.destroy,
+            bg='#e74c3c',
+            fg='white',
+            font=('Arial', 10)
+        )
+        close_btn.pack(side='right', padx=5)
+        
+        refresh()
+    
+    def send_ticket_email(self, ticket_content):
+        """Send the ticket with the engine and explain any failure (worker thread)"""
         try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.email_config["sender_email"]
-            msg['To'] = self.email_config["recipient_email"]
-            
-            ticket_id = f"{self.system_info['hostname']}-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}"
-            msg['Subject'] = f"IT Support Ticket - {ticket_id}"
-            
-            # Email body
-            body = f"""
-IT Support Ticket Request
-
-A new ticket has been generated using AskForHelp AI Assistant.
-
-Ticket ID: {ticket_id}
-User: {self.system_info['username']}
-Hostname: {self.system_info['hostname']}
-IP Address: {self.system_info['ip_address']}
-OS: {self.system_info['os_info']}
-Timestamp: {self.system_info['timestamp']}
-
-Please see the attached ticket content below:
-
-{'='*70}
-{ticket_content}
-{'='*70}
-
-This email was sent automatically by AskForHelp Chatbot.
-            """
-            
-            msg.attach(MIMEText(body, 'plain'))
-            
-            # Check for and attach the most recent screenshot
-            screenshot_attached = False
-            screenshot_pattern = f"Screenshot_{self.system_info['hostname']}*.png"
-            import glob
-            screenshot_files = glob.glob(screenshot_pattern)
-            
-            if screenshot_files:
-                # Get the most recent screenshot
-                latest_screenshot = max(screenshot_files, key=os.path.getctime)
-                
-                with open(latest_screenshot, 'rb') as f:
-                    screenshot_data = f.read()
-                
-                # Attach screenshot
-                screenshot_attachment = MIMEBase('application', 'octet-stream')
-                screenshot_attachment.set_payload(screenshot_data)
-                encoders.encode_base64(screenshot_attachment)
-                
-                filename = os.path.basename(latest_screenshot)
-                screenshot_attachment.add_header(
-                    'Content-Disposition',
-                    f'attachment; filename="{filename}"'
-                )
-                msg.attach(screenshot_attachment)
-                screenshot_attached = True
-            
-            # Connect to SMTP server
-            server = smtplib.SMTP(
-                self.email_config["smtp_server"], 
-                self.email_config["smtp_port"]
-            )
-            
-            if self.email_config["use_tls"]:
-                server.starttls()
-            
-            # Login
-            server.login(
-                self.email_config["sender_email"], 
-                self.email_config["sender_password"]
-            )
-            
-            # Send email
-            server.send_message(msg)
-            server.quit()
-            
+            self.engine.send_ticket_email(ticket_content)
             return True
-            
+        except EmailNotConfiguredError:
+            self.root.after(0, lambda: messagebox.showerror("Email Error", 
+                "Email not configured!\n\n"
+                "Please configure your email settings:\n"
+                "1. Edit the chatbot_engine.py file\n"
+                "2. Update 'sender_email' and 'sender_password' in email_config\n"
+                "3. For Gmail, use an App Password (not your regular password)"))
         except smtplib.SMTPAuthenticationError:
-            messagebox.showerror("Email Error", 
+            self.root.after(0, lambda: messagebox.showerror("Email Error", 
                 "Authentication failed!\n\n"
                 "Please check:\n"
                 "• Your email address and password are correct\n"
                 "• For Gmail, you need to use an App Password\n"
-                "• Enable 'Less secure app access' if using other providers")
-            return False
+                "• Enable 'Less secure app access' if using other providers"))
         except Exception as e:
-            messagebox.showerror("Email Error", 
-                f"Failed to send email:\n{str(e)}\n\n"
-                "Please check your email configuration and network connection.")
-            return False
+            error = str(e)
+            self.root.after(0, lambda: messagebox.showerror("Email Error", 
+                f"Failed to send email:\n{error}\n\n"
+                "Please check your email configuration and network connection."))
+        return False
     
     def generate_ticket(self):
         """Generate an IT support ticket from the chat history"""
@@ -592,7 +707,7 @@ This email was sent automatically by AskForHelp Chatbot.
         ticket_window.geometry("700x650")
         
         # Ticket content
-        ticket_content = self.create_ticket_content()
+        ticket_content = self.engine.create_ticket_content(self.chat_history)
         
         # Text area for ticket
         text_frame = tk.Frame(ticket_window, padx=10, pady=10)
@@ -626,7 +741,7 @@ This email was sent automatically by AskForHelp Chatbot.
         
         def send_email():
             if messagebox.askyesno("Send Email", 
-                f"Send ticket to:\n{self.email_config['recipient_email']}?\n\n"
+                f"Send ticket to:\n{self.engine.email_config['recipient_email']}?\n\n"
                 "Make sure email is configured in the script first!"):
                 self.status_var.set("Sending email...")
                 ticket_window.update()
@@ -680,69 +795,6 @@ This email was sent automatically by AskForHelp Chatbot.
         )
         close_btn.pack(side='right', padx=5)
     
-    def create_ticket_content(self):
-        """Create formatted IT support ticket content"""
-        ticket = f"""
-{'='*70}
-IT SUPPORT TICKET - AskForHelp System
-{'='*70}
-
-TICKET INFORMATION
-------------------
-Ticket ID:      {self.system_info['hostname']}-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}
-Created:        {self.system_info['timestamp']}
-Status:         NEW
-Priority:       To be determined
-
-SYSTEM INFORMATION
-------------------
-Username:       {self.system_info['username']}
-Hostname:       {self.system_info['hostname']}
-IP Address:     {self.system_info['ip_address']}
-Operating System: {self.system_info['os_info']}
-Python Version: {self.system_info['python_version']}
-Serial Number:  {self.system_info['serial_number']}
-
-PROBLEM DESCRIPTION
-------------------
-"""
-        
-        # Extract problem description from chat
-        user_messages = [msg for msg in self.chat_history if msg['sender'] == 'You']
-        if user_messages:
-            ticket += "User's initial description:\n"
-            for msg in user_messages[:3]:  # First 3 user messages
-                ticket += f"  - {msg['message']}\n"
-        else:
-            ticket += "  [No specific problem description provided]\n"
-        
-        ticket += f"""
-CHAT HISTORY SUMMARY
-------------------
-"""
-        
-        # Add relevant chat exchanges
-        for msg in self.chat_history:
-            if not msg['is_system']:
-                ticket += f"[{msg['timestamp']}] {msg['sender']}:\n"
-                ticket += f"  {msg['message']}\n\n"
-        
-        ticket += f"""
-{'='*70}
-ADDITIONAL NOTES
-{'='*70}
-• This ticket was generated using AskForHelp AI Assistant
-• All system information has been automatically collected
-• Please review and update priority as needed
-• Contact IT Support for immediate assistance
-
-{'='*70}
-END OF TICKET
-{'='*70}
-"""
-        
-        return ticket
-    
     def clear_chat(self):
         """Clear the chat history"""
         if messagebox.askyesno("Confirm", "Clear all chat history?"):
@@ -750,6 +802,7 @@ END OF TICKET
             self.chat_display.delete('1.0', tk.END)
             self.chat_display.config(state='disabled')
             self.chat_history = []
+            self.engine.context.reset()
             self.show_welcome_message()
     
     def capture_and_save_screenshot(self):
@@ -760,16 +813,9 @@ END OF TICKET
         # Capture in background thread
         def capture_in_thread():
             try:
-                screenshot_base64 = self.capture_screenshot()
+                filename = self.engine.save_screenshot()
                 
-                if screenshot_base64:
-                    # Decode and save
-                    img_bytes = base64.b64decode(screenshot_base64)
-                    filename = f"Screenshot_{self.system_info['hostname']}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-                    
-                    with open(filename, 'wb') as f:
-                        f.write(img_bytes)
-                    
+                if filename:
                     self.root.after(0, lambda: messagebox.showinfo("Screenshot Captured", 
                         f"Screenshot saved as:\n{filename}"))
                     self.root.after(0, lambda: self.status_var.set("Ready"))
@@ -793,7 +839,7 @@ END OF TICKET
             messagebox.showinfo("Info", "No chat history to export.")
             return
         
-        report_content = self.create_ticket_content()
+        report_content = self.engine.create_ticket_content(self.chat_history)
         
         filename = f"AskForHelp_Report_{self.system_info['hostname']}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         
@@ -808,8 +854,9 @@ END OF TICKET
 
 def main():
     """Main entry point for the application"""
+    start_time = time.perf_counter()
     root = tk.Tk()
-    app = AskForHelpChatbot(root)
+    app = AskForHelpChatbot(root, start_time=start_time)
     root.mainloop()
 
 
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU Tuning Sweep Benchmark
+
+Sends a representative support prompt to an Ollama server once for every
+combination of num_thread, num_ctx and num_batch, and reports prompt and
+generation speed (tokens/s) from Ollama's own timing fields. The value the
+chatbot would pick automatically (see cpu_tuning.py) is marked with *.
+
+Changing num_ctx makes Ollama reload the model; that load is excluded
+from the speeds but shown in its own column.
+
+Usage:
+    python benchmarks/bench_cpu_tuning.py [--model phi:2.7b] [--threads 2 4 8]
+        [--ctx 1024 2048 4096] [--batch 128 256 512] [--repeats 2] [--output sweep.jsonl]
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import cpu_tuning
+import model_behavior_config
+import model_config
+from ollama_client import OllamaClient, get_base_url
+
+
+QUESTION = ("My laptop has been really slow since this morning's update. Outlook takes "
+            "minutes to open and the fan is always running. What can I check?")
+
+
+def build_prompt():
+    """The chatbot's generate prompt with sample system information"""
+    prompt = model_behavior_config.PROMPT_BUILDER.build(
+        "system",
+        username="jdoe",
+        hostname="PC-0042",
+        ip_address="10.0.0.42",
+        os_info="Windows 10 (10.0.19045)",
+        timestamp="2024-01-15 09:30:00",
+        conversation_history="",
+        user_message=QUESTION,
+    )
+    return prompt.text
+
+
+def tokens_per_second(count, duration_ns):
+    """Tokens per second from an Ollama count and duration (nanoseconds)"""
+    return count / (duration_ns / 1e9) if duration_ns else 0.0
+
+
+def run_once(client, model, prompt, options):
+    """One non-streamed generation; returns Ollama's timing fields"""
+    response = client.post('/api/generate', {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "keep_alive": model_config.KEEP_ALIVE,
+        "options": options,
+    })
+    response.raise_for_status()
+    return response.json()
+
+
+def sweep(url, model, threads, contexts, batches, num_predict, repeats, output):
+    """Run every combination and print one line per setting"""
+    client = OllamaClient(url, read_timeout=600)
+    prompt = build_prompt()
+    auto = cpu_tuning.choose_options(cpu_tuning.get_physical_cores(), cpu_tuning.get_memory_gb(),
+                                     model_behavior_config.estimate_tokens(prompt), num_predict)
+
+    print(f"Model: {model}  Server: {client.base_url}  Auto-tuned: {auto}")
+    print(f"{'threads':>8} {'ctx':>6} {'batch':>6} {'load s':>7} {'prompt tok/s':>13} {'gen tok/s':>10}")
+
+    results = []
+    for num_thread, num_ctx, num_batch in itertools.product(threads, contexts, batches):
+        options = {
+            "num_thread": num_thread,
+            "num_ctx": num_ctx,
+            "num_batch": num_batch,
+            "num_predict": num_predict,
+            "temperature": 0.0,
+        }
+
+        load_seconds = 0.0
+        prompt_speeds = []
+        gen_speeds = []
+        try:
+            for _ in range(repeats):
+                result = run_once(client, model, prompt, options)
+                load_seconds += result.get('load_duration', 0) / 1e9
+                prompt_speeds.append(tokens_per_second(result.get('prompt_eval_count', 0),
+                                                       result.get('prompt_eval_duration', 0)))
+                gen_speeds.append(tokens_per_second(result.get('eval_count', 0), result.get('eval_duration', 0)))
+        except Exception as e:
+            print(f"{num_thread:>8} {num_ctx:>6} {num_batch:>6}  failed: {e}")
+            continue
+
+        record = {
+            "num_thread": num_thread,
+            "num_ctx": num_ctx,
+            "num_batch": num_batch,
+            "load_seconds": round(load_seconds, 2),
+            "prompt_tokens_per_second": round(max(prompt_speeds), 1),
+            "generation_tokens_per_second": round(max(gen_speeds), 1),
+        }
+        results.append(record)
+
+        marker = "*" if all(auto[key] == options[key] for key in auto) else " "
+        print(f"{num_thread:>8} {num_ctx:>6} {num_batch:>6} {record['load_seconds']:>7.1f} "
+              f"{record['prompt_tokens_per_second']:>13.1f} {record['generation_tokens_per_second']:>10.1f} {marker}")
+
+    if output:
+        with open(output, 'a', encoding='utf-8') as f:
+            for record in results:
+                f.write(json.dumps(dict(record, model=model)) + "\n")
+        print(f"Results appended to {output}")
+
+    client.close()
+
+
+def main():
+    cores = cpu_tuning.get_physical_cores()
+    parser = argparse.ArgumentParser(description="Sweep Ollama CPU options and record tokens/s")
+    parser.add_argument("--url", default=get_base_url(model_config.OLLAMA_URL), help="Ollama server")
+    parser.add_argument("--model", default=model_config.MODEL_NAME, help="Model to test")
+    parser.add_argument("--threads", type=int, nargs="+",
+                        default=sorted({max(1, cores // 2), cores, os.cpu_count() or cores}),
+                        help="num_thread values")
+    parser.add_argument("--ctx", type=int, nargs="+", default=[1024, 2048, 4096], help="num_ctx values")
+    parser.add_argument("--batch", type=int, nargs="+", default=[128, 256, 512], help="num_batch values")
+    parser.add_argument("--num-predict", type=int, default=64, help="Tokens generated per run")
+    parser.add_argument("--repeats", type=int, default=2, help="Runs per setting (best one is reported)")
+    parser.add_argument("--output", help="Append results to this JSONL file")
+    args = parser.parse_args()
+    sweep(args.url, args.model, args.threads, args.ctx, args.batch, args.num_predict, args.repeats, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Keyword Matcher Micro-Benchmark
+
+Compares the compiled KeywordMatcher in model_behavior_config.py with the
+old approach (lowercase the message and test every keyword with "in")
+on a synthetic corpus of support messages, for growing keyword lists.
+
+Usage:
+    python benchmarks/bench_keyword_matcher.py [--messages 20000] [--terms 30 300 3000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import model_behavior_config
+
+
+WORDS = [
+    "my", "computer", "laptop", "screen", "keeps", "freezing", "when", "I", "open",
+    "outlook", "printer", "not", "printing", "wifi", "dropping", "slow", "after",
+    "update", "the", "mouse", "keyboard", "teams", "meeting", "audio", "camera",
+    "error", "message", "says", "cannot", "connect", "network", "drive", "missing",
+    "password", "expired", "please", "help", "since", "this", "morning", "again",
+]
+
+
+def make_terms(count, rng):
+    """The real keyword lists padded with synthetic multi-word terms"""
+    terms = list(model_behavior_config.ESCALATION_TRIGGERS) + list(model_behavior_config.ALWAYS_ESCALATE)
+    while len(terms) < count:
+        length = rng.randint(1, 3)
+        terms.append(" ".join(f"{rng.choice(WORDS)}x{rng.randint(0, 99999)}" for _ in range(length)))
+    return terms[:count]
+
+
+def make_messages(count, terms, rng):
+    """Random support messages, about one in five containing a keyword"""
+    messages = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(5, 40))]
+        if rng.random() < 0.2:
+            words.insert(rng.randint(0, len(words)), rng.choice(terms))
+        messages.append(" ".join(words))
+    return messages
+
+
+def linear_scan(message, terms):
+    """The previous implementation: substring test for every keyword"""
+    message_lower = message.lower()
+    for term in terms:
+        if term in message_lower:
+            return True
+    return False
+
+
+def run(message_count, term_counts, seed):
+    """Time both approaches for each keyword list size"""
+    rng = random.Random(seed)
+    print(f"{'terms':>8} {'build ms':>10} {'linear us/msg':>14} {'matcher us/msg':>15} {'speedup':>8}")
+
+    for term_count in term_counts:
+        terms = make_terms(term_count, rng)
+        messages = make_messages(message_count, terms, rng)
+
+        started = time.perf_counter()
+        matcher = model_behavior_config.KeywordMatcher({"escalation_trigger": terms})
+        build_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for message in messages:
+            linear_scan(message, terms)
+        linear_us = (time.perf_counter() - started) / message_count * 1e6
+
+        started = time.perf_counter()
+        for message in messages:
+            matcher.search(message)
+        matcher_us = (time.perf_counter() - started) / message_count * 1e6
+
+        print(f"{term_count:>8} {build_ms:>10.1f} {linear_us:>14.2f} {matcher_us:>15.2f} "
+              f"{linear_us / matcher_us:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keyword matcher micro-benchmark")
+    parser.add_argument("--messages", type=int, default=20000, help="Number of synthetic messages")
+    parser.add_argument("--terms", type=int, nargs="+", default=[30, 300, 3000, 10000],
+                        help="Keyword list sizes to test")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    args = parser.parse_args()
+    run(args.messages, args.terms, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+End-to-End Request Path Benchmark
+
+Replays a corpus of support questions through the chatbot's real query_ai()
+path (routing, prompt building, scheduler, streaming) in ChatbotEngine
+against the fake Ollama server in benchmarks/fake_ollama.py, whose timing
+is fixed and configurable. The numbers therefore only change when the client does,
+and every change to the request path can be compared against a baseline:
+
+    python benchmarks/bench_request_path.py --output baseline.json
+    ... change the code ...
+    python benchmarks/bench_request_path.py --baseline baseline.json
+
+Reported: time to first token and total latency percentiles (from the
+chatbot's own request metrics), throughput, and client CPU time and memory.
+The fake server runs in its own process so its CPU use isn't counted. Use
+--url to run against a real Ollama server instead.
+
+The engine runs headless by default. With --ui the questions go through the
+(hidden) Tk window as well, which adds UI render time and how late the Tk
+main loop ran its timers (UI lag); this needs a display (on a Linux server,
+use xvfb-run).
+
+Usage:
+    python benchmarks/bench_request_path.py [--corpus benchmarks/support_questions.jsonl]
+        [--requests 60] [--concurrency 1] [--token-ms 40] [--prompt-ms 2] [--ui]
+        [--output results.json] [--baseline baseline.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARK_DIR, ".."))
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import model_behavior_config
+import model_config
+from chatbot_engine import ChatbotEngine
+from metrics_store import MetricsStore, percentile
+from ollama_client import RequestHandle
+
+
+DEFAULT_CORPUS = os.path.join(BENCHMARK_DIR, "support_questions.jsonl")
+
+# (field, label) reported with p50/p95/p99
+LATENCY_FIELDS = [
+    ("ttft_ms", "Time to first token (ms)"),
+    ("total_ms", "Total latency (ms)"),
+    ("queue_wait_ms", "Queue wait (ms)"),
+    ("connect_ms", "Connect / headers (ms)"),
+    ("render_ms", "UI render time (ms)"),
+    ("ui_lag_ms", "UI timer lag (ms)"),
+]
+
+# Summary values compared against a baseline (lower is better)
+COMPARED = ["ttft_ms.p50", "ttft_ms.p95", "total_ms.p50", "total_ms.p95", "ui_lag_ms.p95",
+            "cpu_ms_per_request", "peak_rss_mb"]
+
+
+def load_corpus(path):
+    """Questions from a JSONL file ({"question": ...} per line) or a plain text file"""
+    questions = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                questions.append(json.loads(line)["question"])
+            else:
+                questions.append(line)
+    return questions
+
+
+def start_fake_server(args):
+    """Run benchmarks/fake_ollama.py in its own process; returns (process, url)"""
+    command = [
+        sys.executable, os.path.join(BENCHMARK_DIR, "fake_ollama.py"),
+        "--port", "0",
+        "--prompt-ms", str(args.prompt_ms),
+        "--token-ms", str(args.token_ms),
+        "--answer-tokens", str(args.answer_tokens),
+        "--load-ms", str(args.load_ms),
+        "--parallel", str(args.parallel),
+        "--jitter", str(args.jitter),
+        "--seed", str(args.seed),
+        "--models", args.model, "nomic-embed-text:latest",
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("Fake Ollama listening on "):
+        process.kill()
+        raise RuntimeError("Fake Ollama server failed to start")
+    return process, line.split()[-1]
+
+
+def get_resource_usage():
+    """Client CPU seconds used so far and memory in MB (current, peak); None if unknown"""
+    if PSUTIL_AVAILABLE:
+        process = psutil.Process()
+        cpu = process.cpu_times()
+        memory = process.memory_info()
+        peak = getattr(memory, "peak_wset", memory.rss)
+        return cpu.user + cpu.system, memory.rss / 1024 ** 2, peak / 1024 ** 2
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = usage.ru_maxrss / 1024 ** 2 if sys.platform == "darwin" else usage.ru_maxrss / 1024
+        return usage.ru_utime + usage.ru_stime, None, peak
+    return time.process_time(), None, None
+
+
+def configure_settings(url, args):
+    """Point the configuration modules at the server before the chatbot reads them"""
+    model_config.OLLAMA_URL = url
+    model_config.OLLAMA_URLS = []
+    model_config.MODEL_NAME = args.model
+    model_config.API_MODE = args.api_mode or model_config.API_MODE
+    model_config.HOT_RELOAD = dict(model_config.HOT_RELOAD, enabled=False)
+
+    performance = dict(model_behavior_config.PERFORMANCE_SETTINGS)
+    performance["cache_responses"] = args.cache
+    performance["semantic_cache"] = False
+    performance["keep_warm_minutes"] = 0
+    model_behavior_config.PERFORMANCE_SETTINGS = performance
+    model_behavior_config.LOG_FILE = args.log_file
+
+
+class UILagProbe:
+    """Measures how late the Tk main loop runs a timer (a busy main loop freezes the window)"""
+
+    def __init__(self, root, interval_ms=50):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.samples = []
+        self.expected = None
+
+    def start(self):
+        self.expected = time.perf_counter() + self.interval_ms / 1000
+        self.root.after(self.interval_ms, self.tick)
+
+    def tick(self):
+        now = time.perf_counter()
+        self.samples.append(max(0.0, (now - self.expected) * 1000))
+        self.expected = now + self.interval_ms / 1000
+        self.root.after(self.interval_ms, self.tick)
+
+
+def replay(engine, questions, args):
+    """Send the questions through query_ai and collect the request metrics"""
+    def ask(question):
+        engine.query_ai(question, [], RequestHandle())
+
+    # Warm-up questions load the model and fill connection pools; not measured
+    for question in questions[:args.warmup]:
+        ask(question)
+    engine.metrics = MetricsStore(max(args.requests, 1))
+
+    schedule = [questions[i % len(questions)] for i in range(args.requests)]
+    cpu_before, _, _ = get_resource_usage()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(ask, schedule))
+    wall_seconds = time.perf_counter() - started
+    cpu_after, rss_mb, peak_rss_mb = get_resource_usage()
+
+    return {
+        "records": engine.metrics.records(),
+        "wall_seconds": wall_seconds,
+        "cpu_seconds": cpu_after - cpu_before,
+        "rss_mb": rss_mb,
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def summarize(run, ui_lag_samples, args):
+    """Percentiles and totals of one benchmark run"""
+    records = run["records"]
+    answered = [r for r in records if r["source"] == "model"]
+    summary = {
+        "requests": len(records),
+        "answered": len(answered),
+        "cached": sum(1 for r in records if r["source"] in ("cache", "semantic_cache")),
+        "failed": sum(1 for r in records if r["source"] in ("offline", "error", "cancelled")),
+        "concurrency": args.concurrency,
+        "ui": args.ui,
+        "api_mode": model_config.API_MODE,
+        "wall_seconds": round(run["wall_seconds"], 2),
+        "requests_per_second": round(len(records) / run["wall_seconds"], 2) if run["wall_seconds"] else None,
+        "cpu_seconds": round(run["cpu_seconds"], 3),
+        "cpu_percent": round(100 * run["cpu_seconds"] / run["wall_seconds"], 1) if run["wall_seconds"] else None,
+        "cpu_ms_per_request": round(1000 * run["cpu_seconds"] / len(records), 2) if records else None,
+        "rss_mb": round(run["rss_mb"], 1) if run["rss_mb"] is not None else None,
+        "peak_rss_mb": round(run["peak_rss_mb"], 1) if run["peak_rss_mb"] is not None else None,
+    }
+
+    for field, label in LATENCY_FIELDS:
+        if field == "ui_lag_ms":
+            values = sorted(ui_lag_samples)
+        else:
+            values = sorted(r[field] for r in answered if r.get(field) is not None)
+        if values:
+            summary[field] = {
+                "p50": round(percentile(values, 0.50), 1),
+                "p95": round(percentile(values, 0.95), 1),
+                "p99": round(percentile(values, 0.99), 1),
+                "max": round(values[-1], 1),
+            }
+    return summary
+
+
+def get_value(summary, key):
+    """A value such as "ttft_ms.p95" from a summary"""
+    value = summary
+    for part in key.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def format_mb(value):
+    """A memory figure, or "n/a" when it couldn't be measured"""
+    return "n/a" if value is None else f"{value} MB"
+
+
+def print_summary(summary, baseline=None):
+    """Print the results, with the change from a baseline run if given"""
+    print(f"Requests: {summary['requests']} ({summary['answered']} answered by the model, "
+          f"{summary['cached']} from the cache, {summary['failed']} failed)  "
+          f"concurrency {summary['concurrency']}  API mode {summary['api_mode']}"
+          f"{'  (through the Tk window)' if summary.get('ui') else ''}")
+    print(f"Wall time: {summary['wall_seconds']} s  Throughput: {summary['requests_per_second']} requests/s")
+    print(f"Client CPU: {summary['cpu_seconds']} s ({summary['cpu_percent']}%, "
+          f"{summary['cpu_ms_per_request']} ms per request)  "
+          f"Memory: {format_mb(summary['rss_mb'])} now, {format_mb(summary['peak_rss_mb'])} peak")
+    print("")
+    print(f"{'Metric':<28} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    print("-" * 68)
+    for field, label in LATENCY_FIELDS:
+        stats = summary.get(field)
+        if stats:
+            print(f"{label:<28} {stats['p50']:>9.1f} {stats['p95']:>9.1f} {stats['p99']:>9.1f} {stats['max']:>9.1f}")
+
+    if baseline:
+        print("")
+        print(f"{'Compared with baseline':<28} {'baseline':>9} {'now':>9} {'change':>9}")
+        print("-" * 58)
+        for key in COMPARED:
+            old = get_value(baseline, key)
+            new = get_value(summary, key)
+            if old is None or new is None:
+                continue
+            change = f"{100 * (new - old) / old:+.1f}%" if old else "n/a"
+            print(f"{key:<28} {old:>9} {new:>9} {change:>9}")
+
+
+def run_headless(questions, args):
+    """Replay the questions through a ChatbotEngine without a window"""
+    engine = ChatbotEngine()
+    engine.start()
+    try:
+        return replay(engine, questions, args), []
+    finally:
+        engine.close()
+
+
+def run_with_ui(questions, args):
+    """Replay the questions through the hidden Tk window (the main loop runs meanwhile)"""
+    import tkinter as tk
+    from askforhelp_chatbot import AskForHelpChatbot
+
+    # The chatbot loads its icon from the working directory
+    os.chdir(os.path.join(BENCHMARK_DIR, ".."))
+    root = tk.Tk()
+    root.withdraw()
+    app = AskForHelpChatbot(root)
+    probe = UILagProbe(root)
+    outcome = {}
+
+    def worker():
+        try:
+            outcome["run"] = replay(app.engine, questions, args)
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            root.after(0, root.quit)
+
+    thread = threading.Thread(target=worker)
+    thread.daemon = True
+    root.after(0, probe.start)
+    root.after(0, thread.start)
+    root.mainloop()
+    root.destroy()
+    app.engine.close()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["run"], probe.samples
+
+
+def run_benchmark(args):
+    """Start the server and the chatbot, replay the corpus and report"""
+    questions = load_corpus(args.corpus)
+    if not questions:
+        raise SystemExit(f"No questions in {args.corpus}")
+
+    server = None
+    url = args.url
+    if url is None:
+        server, url = start_fake_server(args)
+
+    try:
+        configure_settings(url, args)
+        if args.ui:
+            run, ui_lag_samples = run_with_ui(questions, args)
+        else:
+            run, ui_lag_samples = run_headless(questions, args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    return summarize(run, ui_lag_samples, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay support questions through query_ai against a fake Ollama")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Questions (JSONL or one per line)")
+    parser.add_argument("--requests", type=int, default=60, help="Measured questions (the corpus is repeated)")
+    parser.add_argument("--warmup", type=int, default=2, help="Unmeasured questions sent first")
+    parser.add_argument("--concurrency", type=int, default=1, help="Questions sent at the same time")
+    parser.add_argument("--model", default=model_config.MODEL_NAME, help="Model name")
+    parser.add_argument("--api-mode", choices=["chat", "generate"], help="Override model_config.API_MODE")
+    parser.add_argument("--cache", action="store_true", help="Enable the response cache")
+    parser.add_argument("--log-file", default=os.devnull, help="Event log file (default: discard)")
+    parser.add_argument("--url", help="Use this Ollama server instead of starting the fake one")
+    parser.add_argument("--ui", action="store_true", help="Also go through the Tk window (needs a display)")
+
+    fake = parser.add_argument_group("fake server timing")
+    fake.add_argument("--prompt-ms", type=float, default=2.0, help="Prompt evaluation time per token (ms)")
+    fake.add_argument("--token-ms", type=float, default=40.0, help="Generation time per token (ms)")
+    fake.add_argument("--answer-tokens", type=int, default=120, help="Tokens per answer")
+    fake.add_argument("--load-ms", type=float, default=1500.0, help="Model load time (ms)")
+    fake.add_argument("--parallel", type=int, default=1, help="Requests the server processes at once")
+    fake.add_argument("--jitter", type=float, default=0.0, help="Random variation of the delays")
+    fake.add_argument("--seed", type=int, default=42, help="Random seed for the jitter")
+
+    parser.add_argument("--output", help="Save the results as JSON (e.g. as a baseline)")
+    parser.add_argument("--baseline", help="Compare with results saved by --output")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    summary = run_benchmark(args)
+    print_summary(summary, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Fake Ollama Server for Benchmarks
+
+A stand-in for the Ollama API with predictable, configurable timing, so the
+client's request path can be measured without a real model:
+- GET  /api/tags      list of fake models
+- POST /api/generate  streamed or complete answers (an empty prompt loads the model)
+- POST /api/chat      same, in chat format
+- POST /api/embed     deterministic hashed vectors
+
+Each request waits for model load (first use of a model / num_ctx), then
+prompt evaluation (--prompt-ms per prompt token), then produces tokens every
+--token-ms. Like Ollama, it keeps the last prompt of each model and only
+evaluates the part that differs (prompt cache), honours num_predict, runs at
+most --parallel requests at once, stops generating when the client
+disconnects, and reports the usual timing fields in nanoseconds.
+
+Usage:
+    python benchmarks/fake_ollama.py [--port 11500] [--prompt-ms 2] [--token-ms 40]
+        [--answer-tokens 120] [--load-ms 1500] [--parallel 1] [--jitter 0.1]
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+ANSWER_WORDS = (
+    "I understand the issue. First, restart the application and check whether the problem "
+    "continues. Then make sure your network connection is working by opening a website. "
+    "If the printer is involved, check that it is switched on and has paper. Clear any "
+    "stuck print jobs, restart the computer and try again. If none of these steps help, "
+    "please click Generate IT Ticket so our IT team can take a look."
+).split()
+
+
+class FakeOllama:
+    """Timing model and shared state of the fake server"""
+
+    def __init__(self, args):
+        self.args = args
+        self.models = args.models
+        self.slots = threading.BoundedSemaphore(args.parallel)
+        self.lock = threading.Lock()
+        self.loaded = {}
+        self.last_prompts = {}
+        self.random = random.Random(args.seed)
+
+    def jitter(self, seconds):
+        """Add random variation to a delay"""
+        with self.lock:
+            factor = 1 + self.random.uniform(-self.args.jitter, self.args.jitter)
+        return max(0.0, seconds * factor)
+
+    def load(self, model, options):
+        """Simulate loading a model; returns the load time in seconds"""
+        key = (model, options.get("num_ctx"))
+        with self.lock:
+            if self.loaded.get(model) == key:
+                return 0.0
+            self.loaded[model] = key
+        seconds = self.jitter(self.args.load_ms / 1000)
+        time.sleep(seconds)
+        return seconds
+
+    def evaluate_prompt(self, model, prompt):
+        """Simulate prompt evaluation with a prefix cache; returns (tokens, seconds)"""
+        with self.lock:
+            previous = self.last_prompts.get(model, "")
+            self.last_prompts[model] = prompt
+
+        shared = 0
+        if not self.args.no_prompt_cache:
+            limit = min(len(previous), len(prompt))
+            while shared < limit and previous[shared] == prompt[shared]:
+                shared += 1
+
+        tokens = max(1, (len(prompt) - shared + 3) // 4)
+        seconds = self.jitter(tokens * self.args.prompt_ms / 1000)
+        time.sleep(seconds)
+        return tokens, seconds
+
+    def answer_length(self, options):
+        """Number of tokens to generate and the done reason"""
+        num_predict = options.get("num_predict", -1)
+        tokens = self.args.answer_tokens
+        if num_predict is not None and 0 <= num_predict < tokens:
+            return num_predict, "length"
+        return tokens, "stop"
+
+
+def get_prompt_text(payload):
+    """The text the model would evaluate for a generate or chat request"""
+    if "messages" in payload:
+        return "".join(f"{m.get('role')}: {m.get('content', '')}\n" for m in payload["messages"])
+    return payload.get("prompt", "")
+
+
+def hash_vector(text, dimensions=64):
+    """Deterministic embedding from hashed words"""
+    vector = [0.0] * dimensions
+    for word in re.findall(r"\w+", text.lower()):
+        digest = zlib.crc32(word.encode("utf-8"))
+        vector[digest % dimensions] += 1.0 if digest & 1 else -1.0
+    return vector
+
+
+class Handler(BaseHTTPRequestHandler):
+    """HTTP handler for the fake Ollama API"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeOllama/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.fake.args.verbose:
+            super().log_message(format, *args)
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.send_json({"models": [{"name": name, "model": name} for name in self.server.fake.models]})
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        try:
+            payload = self.read_json()
+        except ValueError:
+            self.send_json({"error": "invalid JSON"}, status=400)
+            return
+
+        if self.path == "/api/embed":
+            texts = payload.get("input", [])
+            texts = [texts] if isinstance(texts, str) else texts
+            self.send_json({"model": payload.get("model"), "embeddings": [hash_vector(t) for t in texts]})
+        elif self.path in ("/api/generate", "/api/chat"):
+            self.answer(payload, chat=self.path == "/api/chat")
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def answer(self, payload, chat):
+        fake = self.server.fake
+        model = payload.get("model", "")
+        if model not in fake.models:
+            self.send_json({"error": f"model '{model}' not found"}, status=404)
+            return
+
+        options = payload.get("options") or {}
+        prompt = get_prompt_text(payload)
+        stream = payload.get("stream", True)
+
+        with fake.slots:
+            started = time.perf_counter()
+            load_seconds = fake.load(model, options)
+
+            # An empty request only loads the model
+            if not prompt.strip():
+                self.send_json({"model": model, "response": "", "done": True, "done_reason": "load",
+                                "load_duration": int(load_seconds * 1e9)})
+                return
+
+            prompt_tokens, prompt_seconds = fake.evaluate_prompt(model, prompt)
+            token_count, done_reason = fake.answer_length(options)
+
+            if stream:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+            eval_started = time.perf_counter()
+            parts = []
+            try:
+                for index in range(token_count):
+                    time.sleep(fake.jitter(fake.args.token_ms / 1000))
+                    token = ANSWER_WORDS[index % len(ANSWER_WORDS)] + " "
+                    parts.append(token)
+                    if stream:
+                        self.write_chunk(self.make_chunk(model, token, chat, done=False))
+            except (BrokenPipeError, ConnectionResetError):
+                # Client disconnected (Stop button): stop generating, like Ollama
+                return
+            eval_seconds = time.perf_counter() - eval_started
+
+            final = self.make_chunk(model, "" if stream else "".join(parts), chat, done=True)
+            final.update({
+                "done_reason": done_reason,
+                "total_duration": int((time.perf_counter() - started) * 1e9),
+                "load_duration": int(load_seconds * 1e9),
+                "prompt_eval_count": prompt_tokens,
+                "prompt_eval_duration": int(prompt_seconds * 1e9),
+                "eval_count": token_count,
+                "eval_duration": int(eval_seconds * 1e9),
+            })
+
+            try:
+                if stream:
+                    self.write_chunk(final)
+                    self.wfile.write(b"0\r\n\r\n")
+                else:
+                    self.send_json(final)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    def make_chunk(self, model, text, chat, done):
+        chunk = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "done": done}
+        if chat:
+            chunk["message"] = {"role": "assistant", "content": text}
+        else:
+            chunk["response"] = text
+        return chunk
+
+    def write_chunk(self, data):
+        line = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(line):X}\r\n".encode("ascii") + line + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """Threaded HTTP server that ignores clients closing idle connections"""
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        error = sys.exc_info()[1]
+        if not isinstance(error, (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def create_server(args):
+    """Create the HTTP server (call serve_forever() to run it)"""
+    server = FakeOllamaServer((args.host, args.port), Handler)
+    server.fake = FakeOllama(args)
+    return server
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description="Fake Ollama server with configurable timing")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port", type=int, default=11500, help="Port to listen on (0 = any free port)")
+    parser.add_argument("--models", nargs="+", default=["phi:2.7b", "qwen3:4b", "llama2:13b", "nomic-embed-text:latest"],
+                        help="Model names reported by /api/tags")
+    parser.add_argument("--prompt-ms", type=float, default=2.0, help="Prompt evaluation time per token (ms)")
+    parser.add_argument("--token-ms", type=float, default=40.0, help="Generation time per token (ms)")
+    parser.add_argument("--answer-tokens", type=int, default=120, help="Tokens per answer (before num_predict)")
+    parser.add_argument("--load-ms", type=float, default=1500.0, help="Model load time (ms)")
+    parser.add_argument("--parallel", type=int, default=1, help="Requests processed at the same time")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Random variation of every delay (0.1 = +/-10%%)")
+    parser.add_argument("--no-prompt-cache", action="store_true", help="Evaluate the whole prompt every time")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the jitter")
+    parser.add_argument("--verbose", action="store_true", help="Log every HTTP request")
+    return parser
+
+
+def main():
+    args = get_parser().parse_args()
+    server = create_server(args)
+    host, port = server.server_address[:2]
+    print(f"Fake Ollama listening on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
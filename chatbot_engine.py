@@ -0,0 +1,1145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chatbot Engine for AskForHelp Chatbot
+
+Everything the chatbot does apart from drawing the window: settings and hot
+reload, Ollama servers, model routing, prompt building, caches, request
+scheduling and metrics, system information, tickets, screenshots and email.
+It has no Tkinter dependency, so it can also run in a benchmark, a
+command-line tool or a service.
+
+Front ends follow what the engine is doing by subscribing to its events:
+
+    engine = ChatbotEngine()
+    engine.subscribe(lambda event, data: print(event, data))
+    engine.start()
+    answer, metrics = engine.query_ai("My printer is offline")
+
+Listeners are called on the thread that produced the event (usually a
+worker thread); a GUI has to hand the event over to its own thread.
+
+Events (name: data):
+- status: text, idle, handle       status line text; idle=True only replaces an idle status
+- queue: stats                     request queue depth and wait times changed
+- breaker: state                   the AI server went offline ("open") or came back ("closed")
+- answer: message, metrics, handle  a complete answer (cache, offline or not streamed)
+- answer_start: metrics, handle    a streamed answer begins
+- answer_token: text, handle       a piece of a streamed answer
+- answer_end: handle               the streamed answer is complete
+- error: message, handle           an error message for the user
+- request_done: handle             the question has been handled
+- startup_task_done: name, elapsed  a background startup task finished
+- system_info: elapsed             slow system information (IP, serial number) was loaded
+"""
+
+import base64
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import smtplib
+import socket
+import subprocess
+import threading
+import time
+import uuid
+from email import encoders
+from email.mime.base import MIMEBase
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+import requests
+
+try:
+    from PIL import ImageGrab
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+import model_config
+import model_behavior_config
+from ollama_client import (BackendPool, CircuitBreaker, CircuitOpenError, OllamaAPIError, PromptEvalStats,
+                           RequestCancelled, RequestHandle, get_chunk_text, get_model_size, iter_chunks)
+from hedging import HedgedStream
+from model_router import ModelRouter, is_chat_model
+from cpu_tuning import get_cpu_options, get_prompt_budget
+from config_watcher import ConfigWatcher, create_snapshot
+from metrics_store import MetricsStore, RequestMetrics
+from conversation_context import ConversationContext
+from response_cache import ResponseCache
+from request_scheduler import RequestScheduler
+import semantic_cache
+import event_log
+from event_log import log_event
+
+
+# Shown in the UI while slow system information is still being collected
+SYSTEM_INFO_PLACEHOLDER = "Detecting..."
+
+# Cold-start timings are appended here (one JSON object per launch)
+STARTUP_LOG_FILE = "askforhelp_startup.jsonl"
+
+
+class EmailNotConfiguredError(Exception):
+    """Raised when a ticket is sent before sender_email/sender_password are set"""
+
+
+class ChatbotEngine:
+    """UI-independent core of the chatbot"""
+
+    def __init__(self, start_time=None):
+        self.start_time = start_time or time.perf_counter()
+        self.startup_timings = {}
+        self.listeners = []
+        self.stop_event = threading.Event()
+        self.keep_warm_thread = None
+
+        # System Information (fast fields now, slow lookups in the background)
+        self.system_info = self.get_quick_system_info()
+
+        # Current model_config/model_behavior_config pair (replaced on hot reload)
+        self.settings = create_snapshot(model_config, model_behavior_config)
+        self.config_watcher = None
+
+        # Structured event log (LOG_LEVEL, LOG_RESPONSES, DEBUG_MODE)
+        event_log.configure(model_behavior_config)
+
+        # Ollama API Configuration (from model_config.py)
+        self.ollama_url = model_config.OLLAMA_URL
+        self.breaker = None
+        if model_config.CIRCUIT_BREAKER.get("enabled"):
+            self.breaker = CircuitBreaker(
+                failure_threshold=model_config.CIRCUIT_BREAKER.get("failure_threshold", 3),
+                retry_seconds=model_config.CIRCUIT_BREAKER.get("retry_seconds", 10),
+                on_change=self.on_breaker_change
+            )
+        self.client = BackendPool(
+            model_config.OLLAMA_URLS or [self.ollama_url],
+            probe_interval=model_config.HEALTH_CHECK_INTERVAL,
+            failure_threshold=model_config.BACKEND_FAILURE_THRESHOLD,
+            breaker=self.breaker
+        )
+        self.client.start_health_checks()
+        self.prompt_eval_stats = PromptEvalStats()
+        self.scheduler = RequestScheduler(
+            model_config.MAX_CONCURRENT_REQUESTS,
+            on_change=self.on_queue_change
+        )
+        self.model = model_config.MODEL_NAME
+        self.available_models = [self.model]
+        self.router = ModelRouter(model_config.MODEL_ROUTING, model_behavior_config)
+
+        # CPU options sent with every request (fixed, so Ollama never reloads the model)
+        self.cpu_options = self.get_cpu_options()
+
+        # Answers to repeated questions (PERFORMANCE_SETTINGS["cache_responses"])
+        self.response_cache = self.create_response_cache()
+        self.semantic_cache = self.create_semantic_cache()
+
+        # Email Configuration
+        self.email_config = {
+            "smtp_server": "smtp.gmail.com",  # Change to your SMTP server
+            "smtp_port": 587,
+            "sender_email": "",  # Your email address
+            "sender_password": "",  # Your email password or app password
+            "recipient_email": "douglas.ho@hkuspace.hku.hk",  # IT support email
+            "use_tls": True
+        }
+
+        # Previous messages sent to the model with each question
+        self.context = ConversationContext(self.model_behavior.CONTEXT_SETTINGS)
+
+        # Questions answered from rule templates instead of the AI model
+        self.llm_calls_avoided = 0
+
+        # Per-request timings for the admin metrics view (Ctrl+Shift+M)
+        self.metrics = MetricsStore(self.model_behavior.PERFORMANCE_SETTINGS.get("metrics_max_requests", 1000))
+
+    @property
+    def config(self):
+        """model_config of the current settings snapshot"""
+        return self.settings.model_config
+
+    @property
+    def model_behavior(self):
+        """model_behavior_config of the current settings snapshot"""
+        return self.settings.model_behavior
+
+    def subscribe(self, listener):
+        """Register listener(event, data) to be called for every engine event"""
+        self.listeners.append(listener)
+
+    def emit(self, event, **data):
+        """Send an event to all listeners (a failing listener doesn't stop the engine)"""
+        for listener in list(self.listeners):
+            try:
+                listener(event, data)
+            except Exception as e:
+                log_event("WARNING", "listener_failed", event=event, error=str(e))
+
+    def start(self):
+        """Start background loading and configuration hot reload"""
+        self.start_background_loading()
+        self.start_config_watcher()
+
+    def close(self):
+        """Stop background work and close server connections"""
+        self.stop_event.set()
+        if self.config_watcher is not None:
+            self.config_watcher.stop()
+        self.client.close()
+
+    def start_config_watcher(self):
+        """Apply configuration file changes without a restart (HOT_RELOAD)"""
+        hot_reload = model_config.HOT_RELOAD
+        if not hot_reload.get("enabled"):
+            return
+        self.config_watcher = ConfigWatcher(self.settings, self.apply_settings,
+                                            interval=hot_reload.get("check_interval", 2.0),
+                                            on_reject=self.on_config_rejected,
+                                            on_restart_needed=self.on_restart_needed)
+        self.config_watcher.start()
+
+    def apply_settings(self, snapshot):
+        """Switch to a new, validated settings snapshot (watcher thread)
+
+        Questions already being answered finish with the settings they started with.
+        """
+        previous_model = self.config.MODEL_NAME
+
+        # Objects built from the settings are replaced before the snapshot itself
+        self.router = ModelRouter(snapshot.model_config.MODEL_ROUTING, snapshot.model_behavior)
+        self.context.configure(snapshot.model_behavior.CONTEXT_SETTINGS)
+        self.settings = snapshot
+        event_log.configure(snapshot.model_behavior)
+        log_event("INFO", "config_reloaded", version=snapshot.version)
+
+        if snapshot.model_config.MODEL_NAME != previous_model:
+            self.model = snapshot.model_config.MODEL_NAME
+            if self.model not in self.available_models:
+                self.available_models.append(self.model)
+            if self.model_behavior.PERFORMANCE_SETTINGS.get("preload_models", True):
+                thread = threading.Thread(target=self.warm_up_model)
+                thread.daemon = True
+                thread.start()
+
+        self.emit("status", text="Ready (settings updated)", idle=True, handle=None)
+
+    def on_config_rejected(self, errors):
+        """Show why changed configuration files were not applied (watcher thread)"""
+        text = f"Ready (settings not applied: {errors[0]}"
+        if len(errors) > 1:
+            text += f", and {len(errors) - 1} more"
+        self.emit("status", text=text + ")", idle=True, handle=None)
+
+    def on_restart_needed(self, settings):
+        """Show which reloaded settings only take effect after a restart (watcher thread)"""
+        names = ", ".join(settings)
+        self.emit("status", text=f"Ready (settings updated; restart to apply {names})", idle=True, handle=None)
+
+    def start_background_loading(self):
+        """Start background workers for model list and system information"""
+        def load_models():
+            started = time.perf_counter()
+            self.get_available_models()
+            elapsed = time.perf_counter() - started
+            self.emit("startup_task_done", name="models_ms", elapsed=elapsed)
+
+            # Load the chosen model now so the first question doesn't pay for it
+            if self.model_behavior.PERFORMANCE_SETTINGS.get("preload_models"):
+                self.warm_up_model()
+
+        def load_system_info():
+            started = time.perf_counter()
+            system_info = self.get_system_info()
+            elapsed = time.perf_counter() - started
+
+            # Keep the original session timestamp
+            system_info["timestamp"] = self.system_info["timestamp"]
+            self.system_info = system_info
+            self.emit("system_info", elapsed=elapsed)
+
+        for target in (load_models, load_system_info):
+            thread = threading.Thread(target=target)
+            thread.daemon = True
+            thread.start()
+
+    def warm_up_model(self):
+        """Load the model into Ollama's memory and report the load time (worker thread)"""
+        self.emit("status", text="Loading AI model...", idle=True, handle=None)
+        started = time.perf_counter()
+        load_times = []
+
+        # Every server may receive questions, so load the model on all of them
+        with self.scheduler.slot("background"):
+            for backend in self.client.backends:
+                try:
+                    response = backend.client.load_model(self.model, keep_alive=self.config.KEEP_ALIVE,
+                                                         options=self.cpu_options)
+                    response.raise_for_status()
+                    load_times.append(response.json().get('load_duration', 0) / 1e6)
+                except Exception as e:
+                    log_event("WARNING", "model_preload_failed", url=backend.url, model=self.model, error=str(e))
+
+        if load_times:
+            elapsed = time.perf_counter() - started
+            self.startup_timings["model_load_ms"] = round(max(load_times), 1)
+            self.emit("status", text=f"Ready (AI model loaded in {elapsed:.1f}s)", idle=True, handle=None)
+        else:
+            self.emit("status", text="Ready", idle=True, handle=None)
+
+        # Keep the model loaded while the chatbot is running
+        self.start_keep_warm()
+
+    def start_keep_warm(self):
+        """Ping Ollama periodically so it doesn't unload the model (keep_warm_minutes)"""
+        if self.keep_warm_thread is not None:
+            return
+
+        def run():
+            while True:
+                minutes = self.model_behavior.PERFORMANCE_SETTINGS.get("keep_warm_minutes", 0)
+                if minutes <= 0 or self.stop_event.wait(minutes * 60):
+                    return
+                self.keep_model_warm()
+
+        self.keep_warm_thread = threading.Thread(target=run)
+        self.keep_warm_thread.daemon = True
+        self.keep_warm_thread.start()
+
+    def keep_model_warm(self):
+        """Ping Ollama so it doesn't unload the model"""
+        try:
+            with self.scheduler.slot("background"):
+                for backend in self.client.backends:
+                    if backend.healthy:
+                        backend.client.load_model(self.model, keep_alive=self.config.KEEP_ALIVE,
+                                                  options=self.cpu_options)
+        except Exception as e:
+            log_event("WARNING", "keep_alive_failed", error=str(e))
+
+    def elapsed_ms(self, started):
+        """Milliseconds since a time.perf_counter() value"""
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    def record_startup_timing(self):
+        """Append this launch's cold-start timings to the startup log"""
+        record = {
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "hostname": self.system_info['hostname'],
+            "model": self.model,
+        }
+        record.update(self.startup_timings)
+        log_event("INFO", "startup", **record)
+
+        try:
+            with open(STARTUP_LOG_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            log_event("WARNING", "startup_timing_failed", error=str(e))
+
+    def create_response_cache(self):
+        """Open the on-disk response cache if it is enabled"""
+        performance = self.model_behavior.PERFORMANCE_SETTINGS
+        if not performance.get("cache_responses"):
+            return None
+
+        try:
+            return ResponseCache(
+                performance.get("cache_file", "askforhelp_cache.db"),
+                max_entries=performance.get("cache_max_entries", 5000),
+                ttl_hours=performance.get("cache_ttl_hours", 168)
+            )
+        except Exception as e:
+            log_event("WARNING", "response_cache_disabled", error=str(e))
+            return None
+
+    def create_semantic_cache(self):
+        """Create the similar-question cache if it is enabled"""
+        performance = self.model_behavior.PERFORMANCE_SETTINGS
+        if not performance.get("semantic_cache"):
+            return None
+
+        if not semantic_cache.is_available():
+            log_event("WARNING", "semantic_cache_disabled", error="NumPy is not installed")
+            return None
+
+        if performance.get("semantic_cache_embedder") == "hashing":
+            embedder = semantic_cache.HashingEmbedder()
+        else:
+            embedder = semantic_cache.OllamaEmbedder(
+                self.client, performance.get("embedding_model", "nomic-embed-text"))
+
+        return semantic_cache.SemanticCache(
+            embedder,
+            threshold=performance.get("semantic_cache_threshold", 0.92),
+            max_entries=performance.get("semantic_cache_max_entries", 20000)
+        )
+
+    def lookup_similar_question(self, user_message, model, params=None):
+        """Look up an answer to a similar question, returning (response or None, vector)"""
+        try:
+            return self.semantic_cache.lookup(user_message, model, params)
+        except Exception as e:
+            log_event("WARNING", "semantic_cache_failed", error=str(e))
+            return None, None
+
+    def get_available_models(self):
+        """Get list of available Ollama models (for admin use)"""
+        try:
+            response = self.client.tags(read_timeout=10)
+
+            if response.status_code == 200:
+                result = response.json()
+                models = result.get('models', [])
+                self.available_models = [model['name'] for model in models]
+
+                # Ensure current model is in the list
+                if self.model not in self.available_models and self.available_models:
+                    self.model = self.available_models[0]
+            else:
+                # Fallback to default model if API fails
+                self.available_models = [self.model]
+
+        except Exception as e:
+            log_event("WARNING", "model_list_failed", error=str(e))
+            # Fallback to default model
+            self.available_models = [self.model]
+
+    def get_serial_number(self):
+        """Get PC serial number (Windows only)"""
+        try:
+            if platform.system() == "Windows":
+                # Get serial number using WMIC
+                result = subprocess.run(
+                    ["wmic", "bios", "get", "serialnumber"],
+                    capture_output=True,
+                    text=True,
+                    creationflags=subprocess.CREATE_NO_WINDOW
+                )
+                serial = result.stdout.strip().split('\n')[-1].strip()
+                return serial if serial and serial != "" else "Unknown"
+            else:
+                # For Linux/Mac, try different methods
+                try:
+                    # Linux
+                    result = subprocess.run(
+                        ["cat", "/sys/class/dmi/id/product_uuid"],
+                        capture_output=True,
+                        text=True
+                    )
+                    if result.returncode == 0:
+                        return result.stdout.strip()
+                except:
+                    pass
+                return "Unknown"
+        except:
+            return "Unknown"
+
+    def capture_screenshot(self):
+        """Capture screenshot and return as base64 encoded image"""
+        if not PIL_AVAILABLE:
+            log_event("ERROR", "screenshot_failed", error="Pillow is not installed")
+            return None
+
+        try:
+            # Capture screenshot
+            screenshot = ImageGrab.grab()
+
+            # Convert to bytes
+            img_byte_arr = io.BytesIO()
+            screenshot.save(img_byte_arr, format='PNG')
+            img_byte_arr = img_byte_arr.getvalue()
+
+            # Encode to base64
+            img_base64 = base64.b64encode(img_byte_arr).decode('utf-8')
+
+            return img_base64
+        except Exception as e:
+            log_event("ERROR", "screenshot_failed", error=str(e))
+            return None
+
+    def save_screenshot(self):
+        """Capture a screenshot into a PNG file; returns the file name or None"""
+        screenshot_base64 = self.capture_screenshot()
+        if not screenshot_base64:
+            return None
+
+        # Decode and save
+        img_bytes = base64.b64decode(screenshot_base64)
+        filename = f"Screenshot_{self.system_info['hostname']}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+
+        with open(filename, 'wb') as f:
+            f.write(img_bytes)
+        return filename
+
+    def get_quick_system_info(self):
+        """Collect the system information that is available instantly"""
+        try:
+            username = os.getlogin()
+        except:
+            username = "Unknown"
+
+        try:
+            hostname = platform.node()
+        except:
+            hostname = "Unknown"
+
+        try:
+            os_info = platform.system() + " " + platform.release()
+        except:
+            os_info = "Unknown"
+
+        try:
+            python_version = platform.python_version()
+        except:
+            python_version = "Unknown"
+
+        return {
+            "username": username,
+            "hostname": hostname,
+            "ip_address": SYSTEM_INFO_PLACEHOLDER,
+            "os_info": os_info,
+            "python_version": python_version,
+            "serial_number": SYSTEM_INFO_PLACEHOLDER,
+            "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+
+    def get_system_info(self):
+        """Collect system information for IT reports (includes slow lookups)"""
+        system_info = self.get_quick_system_info()
+
+        # DNS lookup, can take several seconds on a slow network
+        try:
+            system_info["ip_address"] = socket.gethostbyname(socket.gethostname())
+        except:
+            system_info["ip_address"] = "Unknown"
+
+        # Shells out to wmic on Windows
+        try:
+            system_info["serial_number"] = self.get_serial_number()
+        except:
+            system_info["serial_number"] = "Unknown"
+
+        return system_info
+
+    def get_request_priority(self, user_message, route, settings=None):
+        """Scheduling class of a question: urgent issues go first, long answers last"""
+        behavior = (settings or self.settings).model_behavior
+        if route["tier"] == "urgent" or behavior.should_escalate(user_message):
+            return "urgent"
+        if route["tier"] == "complex" or behavior.RESPONSE_LENGTH == "detailed":
+            return "educational"
+        return "normal"
+
+    def get_route(self, user_message, history):
+        """Model, preset and tier for a question (see model_router.py)"""
+        turns = len(self.context.get_turns(history))
+        return self.router.route(user_message, turns, self.available_models, self.model)
+
+    def on_breaker_change(self, state):
+        """Report when the AI server goes offline or comes back (called from any thread)"""
+        self.emit("breaker", state=state)
+
+    def answer_offline(self, user_message, route, settings, handle, caches_checked=False, metrics=None):
+        """Answer without the AI server: rule templates, then cached answers, then a generic reply"""
+        behavior = settings.model_behavior
+        route = route or {"model": self.model, "preset": None}
+        response = behavior.get_rule_response(user_message)
+
+        # Follow-up questions normally skip the caches; offline, an earlier
+        # answer to the same question is better than nothing
+        if not response and not caches_checked:
+            cache_params = self.get_cache_params(route["preset"], settings)
+            if self.response_cache is not None:
+                response = self.response_cache.get(user_message, route["model"], cache_params)
+            if not response and self.semantic_cache is not None:
+                response, _ = self.lookup_similar_question(user_message, route["model"], cache_params)
+
+        if not response:
+            response = behavior.get_template("offline")
+
+        if metrics is not None:
+            metrics.set("source", "offline")
+        self.emit("answer", message=response, metrics=metrics, handle=handle)
+        self.emit("status", text="Offline (answered without the AI server)", idle=False, handle=handle)
+        return response
+
+    def on_queue_change(self, stats):
+        """Report scheduler queue depth and wait time (called from any thread)"""
+        self.emit("queue", stats=stats)
+
+    def answer_from_rules(self, user_message):
+        """Answer a clear escalation from the response templates
+
+        Returns (response, metrics), or (None, None) when no rule applies.
+        Pass the metrics to record_request() once the answer has been shown.
+        """
+        rules = self.model_behavior.RULE_SETTINGS
+        if not rules.get("enabled"):
+            return None, None
+
+        rule_response = self.model_behavior.get_rule_response(user_message)
+        if not rule_response:
+            return None, None
+
+        self.llm_calls_avoided += 1
+        metrics = RequestMetrics()
+        metrics.set("source", "rules")
+        metrics.set("request_id", uuid.uuid4().hex[:12])
+        log_event("INFO", "escalation", request_id=metrics.values["request_id"], source="rules",
+                  **self.get_logged_text("question", user_message))
+        return rule_response, metrics
+
+    def record_request(self, metrics, answer=None, settings=None, result=None):
+        """Finish a question's metrics, keep them and log the response"""
+        metrics.finish(result)
+        self.metrics.add(metrics)
+        self.log_request_finished(metrics, answer, settings)
+
+    def build_generate_payload(self, user_message, history, template="system", route=None, settings=None):
+        """Build a /api/generate request with the full prompt in one string"""
+        settings = settings or self.settings
+
+        # Previous messages of this conversation (within the token budget)
+        conversation_history = self.context.build(history)
+
+        # Prepare the prompt with context using model behavior configuration
+        prompt = settings.model_behavior.PROMPT_BUILDER.build(
+            template,
+            username=self.system_info['username'],
+            hostname=self.system_info['hostname'],
+            os_info=self.system_info['os_info'],
+            ip_address=self.system_info['ip_address'],
+            timestamp=self.system_info['timestamp'],
+            conversation_history=conversation_history,
+            user_message=user_message
+        )
+
+        route = route or {"model": self.model, "preset": None}
+        return {
+            "model": route["model"],
+            "prompt": prompt.text,
+            "stream": True,
+            "keep_alive": settings.model_config.KEEP_ALIVE,
+            "options": self.get_request_options(route["preset"], settings)
+        }
+
+    def build_chat_payload(self, user_message, history, template=None, route=None, settings=None):
+        """Build a /api/chat request: fixed system message, then the conversation"""
+        settings = settings or self.settings
+
+        # The system message must not change between questions so that
+        # Ollama can serve it from its prompt cache
+        system_prompt = settings.model_behavior.PROMPT_BUILDER.build(
+            "chat_system",
+            username=self.system_info['username'],
+            hostname=self.system_info['hostname'],
+            os_info=self.system_info['os_info']
+        )
+
+        messages = [{"role": "system", "content": system_prompt.text}]
+        messages.extend(self.context.build_messages(history))
+
+        # Scenario templates (e.g. "urgent") wrap the question itself, so the
+        # system message above stays the same
+        if template:
+            user_message = settings.model_behavior.PROMPT_BUILDER.build(template, user_message=user_message).text
+        messages.append({"role": "user", "content": user_message})
+
+        route = route or {"model": self.model, "preset": None}
+        return {
+            "model": route["model"],
+            "messages": messages,
+            "stream": True,
+            "keep_alive": settings.model_config.KEEP_ALIVE,
+            "options": self.get_request_options(route["preset"], settings)
+        }
+
+    def get_cpu_options(self):
+        """num_thread/num_ctx/num_batch for the Ollama server (see cpu_tuning.py)"""
+        behavior = self.model_behavior
+        answer_tokens = max([behavior.MAX_TOKENS] + [p.get("max_tokens", 0) for p in behavior.PRESETS.values()])
+        prompt_tokens = get_prompt_budget(behavior.PROMPT_BUILDER, behavior.CONTEXT_SETTINGS.get("max_context_tokens", 1024))
+
+        try:
+            options = get_cpu_options([backend.url for backend in self.client.backends], self.config.CPU_TUNING, prompt_tokens, answer_tokens)
+        except Exception as e:
+            log_event("WARNING", "cpu_tuning_failed", error=str(e))
+            return {}
+
+        if options:
+            log_event("INFO", "cpu_tuning", **options)
+        return options
+
+    def get_request_options(self, preset=None, settings=None):
+        """Generation options of a request plus the fixed CPU tuning options"""
+        options = (settings or self.settings).model_behavior.get_ollama_options(preset)
+        options.update(self.cpu_options)
+        return options
+
+    def get_cache_params(self, preset=None, settings=None):
+        """Everything besides the question and model that changes the answer"""
+        settings = settings or self.settings
+        behavior = settings.model_behavior
+        template = "chat_system" if settings.model_config.API_MODE == "chat" else "system"
+        params = dict(behavior.get_model_parameters(preset))
+        params["prompt_template"] = behavior.PROMPT_BUILDER.templates[template].template
+        return params
+
+    def query_ai(self, user_message, history=None, handle=None):
+        """Query the Ollama API; returns (answer or None, RequestMetrics)"""
+        handle = handle or RequestHandle()
+
+        # The whole request uses one settings snapshot, even if the
+        # configuration is reloaded meanwhile
+        settings = self.settings
+        route = None
+        first_question = False
+        result = None
+        answer = None
+        metrics = RequestMetrics()
+        request_id = uuid.uuid4().hex[:12]
+        metrics.set("request_id", request_id)
+        try:
+            # Pick the model and preset for this question
+            route = self.get_route(user_message, history or [])
+            metrics.set("model", route["model"])
+            log_event("INFO", "request", request_id=request_id, model=route["model"], tier=route["tier"],
+                      preset=route["preset"], **self.get_logged_text("question", user_message, settings))
+
+            # Only the first question of a conversation can be answered from the
+            # cache; follow-up answers depend on the earlier messages
+            first_question = not self.context.has_history(history or [])
+            cache_params = self.get_cache_params(route["preset"], settings)
+            use_cache = self.response_cache is not None and first_question
+            if use_cache:
+                cached_response = self.response_cache.get(user_message, route["model"], cache_params)
+                if cached_response:
+                    answer = cached_response
+                    log_event("INFO", "cache_hit", request_id=request_id, cache="exact")
+                    metrics.set("source", "cache")
+                    self.emit("answer", message=cached_response, metrics=metrics, handle=handle)
+                    self.emit("status", text="Ready (answered from cache)", idle=False, handle=handle)
+                    return answer, metrics
+
+            # Then try answers to similarly worded questions
+            use_semantic_cache = self.semantic_cache is not None and first_question
+            question_vector = None
+            if use_semantic_cache:
+                similar_response, question_vector = self.lookup_similar_question(
+                    user_message, route["model"], cache_params)
+                if similar_response:
+                    answer = similar_response
+                    log_event("INFO", "cache_hit", request_id=request_id, cache="semantic")
+                    metrics.set("source", "semantic_cache")
+                    self.emit("answer", message=similar_response, metrics=metrics, handle=handle)
+                    self.emit("status", text="Ready (answered from similar question)", idle=False, handle=handle)
+                    return answer, metrics
+
+            # Don't queue for a server that is known to be down
+            if self.breaker is not None and self.breaker.retry_in() > 0:
+                raise CircuitOpenError("Ollama is unreachable")
+
+            # Urgent issues use the short "urgent" prompt and jump the queue
+            priority = self.get_request_priority(user_message, route, settings)
+            template = "urgent" if priority == "urgent" else None
+            if priority == "urgent":
+                log_event("INFO", "escalation", request_id=request_id, source="model")
+
+            if settings.model_config.API_MODE == "chat":
+                payload = self.build_chat_payload(user_message, history or [], template, route, settings)
+            else:
+                payload = self.build_generate_payload(user_message, history or [], template or "system", route, settings)
+            if event_log.is_enabled("DEBUG"):
+                log_event("DEBUG", "payload", request_id=request_id, payload=payload)
+
+            position = self.scheduler.position(priority)
+            if position:
+                self.emit("status", text=f"Waiting for AI server ({position} ahead)...", idle=False, handle=handle)
+
+            # Send request to Ollama. The response is always streamed from the
+            # server so that Stop can close the connection, which makes Ollama
+            # abandon the generation and free its slot.
+            with self.scheduler.slot(priority, handle) as slot:
+                metrics.set("queue_wait_ms", slot.waited * 1000)
+                self.emit("status", text="Thinking...", idle=False, handle=handle)
+                chunks = self.open_answer_stream(payload, handle, metrics)
+                token_limit = settings.model_behavior.get_output_token_limit(payload["options"])
+                live = settings.model_config.STREAM_RESPONSES
+                ai_response, result = self.read_stream(chunks, handle, token_limit, live=live, metrics=metrics)
+
+            self.record_prompt_eval(result)
+            answer = ai_response
+            metrics.set("done_reason", result.get('done_reason') if result else "client_limit")
+
+            # Without live streaming the answer is sent once it is complete
+            # (so is the placeholder when a live stream ended without any chunk)
+            if not live or (not ai_response and result is None):
+                self.emit("answer", message=ai_response or 'No response received.', metrics=metrics, handle=handle)
+
+            if result is None and ai_response:
+                status = "Ready (answer cut off at the length limit)"
+            elif result and result.get('done_reason') == "length":
+                status = "Ready (answer reached the length limit)"
+            else:
+                status = "Ready"
+            self.emit("status", text=status, idle=False, handle=handle)
+
+            # Cache complete answers only
+            answer_complete = bool(ai_response and result and result.get('done'))
+            if use_cache and answer_complete:
+                self.response_cache.put(user_message, route["model"], cache_params, ai_response)
+            if use_semantic_cache and answer_complete and question_vector is not None:
+                self.semantic_cache.add(user_message, route["model"], ai_response, question_vector, cache_params)
+
+        except RequestCancelled:
+            metrics.set("source", "cancelled")
+        except CircuitOpenError:
+            answer = self.answer_offline(user_message, route, settings, handle, first_question, metrics)
+        except requests.exceptions.ConnectionError as e:
+            log_event("ERROR", "request_error", request_id=request_id, error_type=type(e).__name__, error=str(e))
+            error_msg = f"❌ Error: Cannot connect to Ollama. Please ensure Ollama is running on {self.client.base_url}."
+            self.emit("error", message=error_msg, handle=handle)
+            answer = self.answer_offline(user_message, route, settings, handle, first_question, metrics)
+        except Exception as e:
+            metrics.set("source", "error")
+            log_event("ERROR", "request_error", request_id=request_id, error_type=type(e).__name__, error=str(e))
+            self.emit("error", message=f"❌ Error: {str(e)}", handle=handle)
+            self.emit("status", text="Error", idle=False, handle=handle)
+        finally:
+            handle.close()
+            self.record_request(metrics, answer, settings, result)
+            self.emit("request_done", handle=handle)
+
+        return answer, metrics
+
+    def get_logged_text(self, name, text, settings=None):
+        """A question or answer for the event log: in full, or only its length (LOG_RESPONSES)"""
+        if (settings or self.settings).model_behavior.LOG_RESPONSES:
+            return {name: text}
+        return {f"{name}_chars": len(text or "")}
+
+    def log_request_finished(self, metrics, answer=None, settings=None):
+        """Log how a question was answered, with its timings"""
+        fields = {name: round(value, 1) if isinstance(value, float) else value
+                  for name, value in metrics.values.items() if name != "timestamp"}
+        if answer:
+            fields.update(self.get_logged_text("answer", answer, settings))
+        log_event("INFO", "response", **fields)
+
+    def record_prompt_eval(self, result):
+        """Record how long Ollama spent evaluating the prompt"""
+        if result:
+            self.prompt_eval_stats.record(result)
+            log_event("DEBUG", "prompt_eval", summary=self.prompt_eval_stats.summary())
+
+    def get_metrics_report(self):
+        """Text of the admin metrics view"""
+        lines = [self.metrics.format_report(), "", self.prompt_eval_stats.summary()]
+
+        stats = self.scheduler.stats()
+        lines.append(f"Queue: {stats['queued']} waiting, {stats['active']} active, "
+                     f"average wait by class: {stats['average_wait']}")
+
+        if self.breaker is not None:
+            lines.append(f"Circuit breaker: {self.breaker.state}")
+        for backend in self.client.status():
+            state = "healthy" if backend['healthy'] else f"ejected ({backend['last_error']})"
+            lines.append(f"Server {backend['url']}: {state}, {backend['outstanding']} in flight")
+
+        if self.response_cache is not None:
+            lines.append(f"Response cache: {self.response_cache.stats()}")
+        if self.semantic_cache is not None:
+            lines.append(f"Semantic cache: {self.semantic_cache.stats()}")
+        lines.append(f"AI calls avoided by rule answers: {self.llm_calls_avoided}")
+        lines.append(f"CPU options: {self.cpu_options or 'Ollama defaults'}")
+
+        lines.append("")
+        lines.append("Prompt templates (estimated tokens):")
+        for name, info in self.model_behavior.PROMPT_BUILDER.get_token_report().items():
+            lines.append(f"  {name}: {info['shared_prefix_tokens']} shared prefix, "
+                         f"last {info['last_tokens']}, average {info['average_tokens']} "
+                         f"over {info['prompts_built']} prompts")
+        return "\n".join(lines)
+
+    def stream_from_backend(self, payload, handle, metrics=None, exclude=(), used=None):
+        """Send a streaming request and yield its chunks (holds a server while reading)
+
+        exclude: backends not to use if another one is available;
+        used: list the chosen backend is appended to.
+        """
+        with self.client.acquire(exclude) as client:
+            if used is not None:
+                used.append(self.client.get_backend(client))
+            sent = time.perf_counter()
+            try:
+                if "messages" in payload:
+                    response = client.chat(payload, stream=True, handle=handle)
+                else:
+                    response = client.generate(payload, stream=True, handle=handle)
+            except Exception:
+                # Cancelled while waiting for the headers: the connection was shut down
+                if handle.is_cancelled():
+                    raise RequestCancelled()
+                raise
+            if metrics is not None and "connect_ms" not in metrics.values:
+                metrics.set("connect_ms", (time.perf_counter() - sent) * 1000)
+            handle.attach(response)
+
+            if response.status_code != 200:
+                response.close()
+                raise OllamaAPIError(f"API Error: {response.status_code} - {response.text}")
+
+            try:
+                yield from iter_chunks(response)
+            except Exception:
+                # Reading a connection closed by Stop or a lost hedge race fails
+                # in various ways; it is not a server failure
+                if handle.is_cancelled():
+                    raise RequestCancelled()
+                raise
+
+    def get_hedge_payload(self, payload):
+        """The backup request for hedging, or None when there is nothing to fall back to"""
+        if not self.config.HEDGING.get("enabled"):
+            return None
+
+        # Another server can run the same model (the backup is sent to a
+        # different server than the first request)
+        if self.client.healthy_count() > 1:
+            return payload
+
+        # Otherwise use a lighter model on the same server
+        fallback = self.config.HEDGING.get("fallback_model")
+        if not fallback:
+            current_size = get_model_size(payload["model"])
+            sized = [(get_model_size(name), name) for name in self.available_models if is_chat_model(name)]
+            smaller = [(size, name) for size, name in sized
+                       if size is not None and current_size is not None and size < current_size]
+            fallback = min(smaller)[1] if smaller else None
+
+        if not fallback or fallback == payload["model"]:
+            return None
+        return dict(payload, model=fallback)
+
+    def open_answer_stream(self, payload, handle, metrics=None):
+        """Start streaming the answer, hedged with a backup request if enabled"""
+        hedge_payload = self.get_hedge_payload(payload)
+        if hedge_payload is None:
+            return self.stream_from_backend(payload, handle, metrics)
+
+        # The same model is retried on another server than the first request's
+        used = []
+        same_model = hedge_payload is payload
+        return HedgedStream(
+            lambda attempt_handle: self.stream_from_backend(payload, attempt_handle, metrics, used=used),
+            lambda attempt_handle: self.stream_from_backend(hedge_payload, attempt_handle, metrics,
+                                                            exclude=tuple(used) if same_model else ()),
+            deadline=self.config.HEDGING.get("first_token_deadline", 8.0),
+            handle=handle,
+            scheduler=self.scheduler
+        )
+
+    def read_stream(self, chunks, handle, token_limit=None, live=None, metrics=None):
+        """Consume Ollama's stream chunks and send the tokens as answer_token events
+
+        Stops reading (and closes the connection, which ends the generation)
+        after token_limit chunks of text; the final chunk is then None.
+        The answer is only started once the first chunk arrives: the request
+        is sent when iteration begins, and a server that can't be reached or
+        refuses the request must not leave an empty answer behind.
+        """
+        if live is None:
+            live = self.config.STREAM_RESPONSES
+
+        parts = []
+        final_chunk = None
+        started = False
+        try:
+            for chunk in chunks:
+                if handle.is_cancelled():
+                    raise RequestCancelled()
+
+                if not started:
+                    started = True
+                    if live:
+                        self.emit("answer_start", metrics=metrics, handle=handle)
+                    self.emit("status", text="Answering...", idle=False, handle=handle)
+
+                # Ollama streams about one token per chunk
+                text = get_chunk_text(chunk)
+                if text:
+                    if metrics is not None and not parts:
+                        metrics.mark("ttft_ms")
+                    parts.append(text)
+                    if live:
+                        self.emit("answer_token", text=text, handle=handle)
+                    if token_limit and len(parts) >= token_limit:
+                        log_event("WARNING", "output_guard", tokens=len(parts))
+                        break
+
+                # The last chunk carries Ollama's timing statistics
+                if chunk.get('done'):
+                    final_chunk = chunk
+                    break
+        except Exception:
+            # Reading from a connection closed by Stop fails in various ways
+            if handle.is_cancelled():
+                raise RequestCancelled()
+            raise
+        finally:
+            chunks.close()
+            if live and started:
+                self.emit("answer_end", handle=handle)
+
+        return "".join(parts), final_chunk
+
+    def send_ticket_email(self, ticket_content):
+        """Send ticket via email to IT support with automatic screenshot attachment
+
+        Raises EmailNotConfiguredError, smtplib.SMTPAuthenticationError or
+        other errors from smtplib when the email can't be sent.
+        """
+        if not self.email_config["sender_email"] or not self.email_config["sender_password"]:
+            raise EmailNotConfiguredError("sender_email and sender_password are not set")
+
+        # Create message
+        msg = MIMEMultipart()
+        msg['From'] = self.email_config["sender_email"]
+        msg['To'] = self.email_config["recipient_email"]
+
+        ticket_id = f"{self.system_info['hostname']}-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        msg['Subject'] = f"IT Support Ticket - {ticket_id}"
+
+        # Email body
+        body = f"""
+IT Support Ticket Request
+
+A new ticket has been generated using AskForHelp AI Assistant.
+
+Ticket ID: {ticket_id}
+User: {self.system_info['username']}
+Hostname: {self.system_info['hostname']}
+IP Address: {self.system_info['ip_address']}
+OS: {self.system_info['os_info']}
+Timestamp: {self.system_info['timestamp']}
+
+Please see the attached ticket content below:
+
+{'='*70}
+{ticket_content}
+{'='*70}
+
+This email was sent automatically by AskForHelp Chatbot.
+            """
+
+        msg.attach(MIMEText(body, 'plain'))
+
+        # Check for and attach the most recent screenshot
+        screenshot_pattern = f"Screenshot_{self.system_info['hostname']}*.png"
+        screenshot_files = glob.glob(screenshot_pattern)
+
+        if screenshot_files:
+            # Get the most recent screenshot
+            latest_screenshot = max(screenshot_files, key=os.path.getctime)
+
+            with open(latest_screenshot, 'rb') as f:
+                screenshot_data = f.read()
+
+            # Attach screenshot
+            screenshot_attachment = MIMEBase('application', 'octet-stream')
+            screenshot_attachment.set_payload(screenshot_data)
+            encoders.encode_base64(screenshot_attachment)
+
+            filename = os.path.basename(latest_screenshot)
+            screenshot_attachment.add_header(
+                'Content-Disposition',
+                f'attachment; filename="{filename}"'
+            )
+            msg.attach(screenshot_attachment)
+
+        # Connect to SMTP server
+        server = smtplib.SMTP(
+            self.email_config["smtp_server"],
+            self.email_config["smtp_port"]
+        )
+
+        if self.email_config["use_tls"]:
+            server.starttls()
+
+        # Login
+        server.login(
+            self.email_config["sender_email"],
+            self.email_config["sender_password"]
+        )
+
+        # Send email
+        server.send_message(msg)
+        server.quit()
+
+    def create_ticket_content(self, chat_history):
+        """Create formatted IT support ticket content from a conversation"""
+        ticket = f"""
+{'='*70}
+IT SUPPORT TICKET - AskForHelp System
+{'='*70}
+
+TICKET INFORMATION
+------------------
+Ticket ID:      {self.system_info['hostname']}-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}
+Created:        {self.system_info['timestamp']}
+Status:         NEW
+Priority:       To be determined
+
+SYSTEM INFORMATION
+------------------
+Username:       {self.system_info['username']}
+Hostname:       {self.system_info['hostname']}
+IP Address:     {self.system_info['ip_address']}
+Operating System: {self.system_info['os_info']}
+Python Version: {self.system_info['python_version']}
+Serial Number:  {self.system_info['serial_number']}
+
+PROBLEM DESCRIPTION
+------------------
+"""
+
+        # Extract problem description from chat
+        user_messages = [msg for msg in chat_history if msg['sender'] == 'You']
+        if user_messages:
+            ticket += "User's initial description:\n"
+            for msg in user_messages[:3]:  # First 3 user messages
+                ticket += f"  - {msg['message']}\n"
+        else:
+            ticket += "  [No specific problem description provided]\n"
+
+        ticket += """
+CHAT HISTORY SUMMARY
+------------------
+"""
+
+        # Add relevant chat exchanges
+        for msg in chat_history:
+            if not msg['is_system']:
+                ticket += f"[{msg['timestamp']}] {msg['sender']}:\n"
+                ticket += f"  {msg['message']}\n\n"
+
+        ticket += f"""
+{'='*70}
+ADDITIONAL NOTES
+{'='*70}
+• This ticket was generated using AskForHelp AI Assistant
+• All system information has been automatically collected
+• Please review and update priority as needed
+• Contact IT Support for immediate assistance
+
+{'='*70}
+END OF TICKET
+{'='*70}
+"""
+
+        return ticket
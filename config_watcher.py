@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Configuration Hot Reload for AskForHelp Chatbot
+
+Watches model_config.py and model_behavior_config.py and applies changes
+while the application is running, so a prompt or parameter change can be
+rolled out without asking every user to restart.
+
+When either file changes, both are loaded as fresh module objects (the
+modules already in use are never modified) and checked with their
+validate_configuration() functions. If both are valid, they are handed to
+the application as a new ConfigSnapshot; otherwise the errors are logged
+(config_rejected), passed to on_reject, and the current snapshot stays in
+use until the file is saved again.
+
+Settings that are used to set up connections, background workers, caches
+and the event log (RESTART_SETTINGS, BEHAVIOR_RESTART_SETTINGS) still need a
+restart; a change to one of them is reported.
+
+A PyInstaller build imports the bundled copies from its temporary extraction
+folder, which is recreated on every launch. There, the copies placed next to
+AskForHelp.exe are watched instead, and loaded on the first check.
+"""
+
+import collections
+import importlib.util
+import os
+import sys
+import threading
+import time
+
+from event_log import log_event
+
+
+# A consistent pair of configuration modules; replaced as a whole, never modified
+ConfigSnapshot = collections.namedtuple("ConfigSnapshot", ["version", "model_config", "model_behavior", "loaded_at"])
+
+# model_config settings that only take effect after a restart
+RESTART_SETTINGS = [
+    "OLLAMA_URL", "OLLAMA_URLS", "HEALTH_CHECK_INTERVAL", "BACKEND_FAILURE_THRESHOLD",
+    "MAX_CONCURRENT_REQUESTS", "CONNECT_TIMEOUT", "READ_TIMEOUT", "HTTP_POOL_SIZE",
+    "CPU_TUNING", "CIRCUIT_BREAKER", "HOT_RELOAD",
+]
+
+# model_behavior_config settings that only take effect after a restart: the
+# event log, response caches and metrics store are set up at start-up
+# ("NAME.key" is a key of a settings dictionary)
+BEHAVIOR_RESTART_SETTINGS = [
+    "LOG_FILE", "LOG_MAX_BYTES", "LOG_BACKUP_COUNT",
+    "PERFORMANCE_SETTINGS.cache_responses", "PERFORMANCE_SETTINGS.cache_file",
+    "PERFORMANCE_SETTINGS.cache_ttl_hours", "PERFORMANCE_SETTINGS.cache_max_entries",
+    "PERFORMANCE_SETTINGS.semantic_cache", "PERFORMANCE_SETTINGS.semantic_cache_embedder",
+    "PERFORMANCE_SETTINGS.embedding_model", "PERFORMANCE_SETTINGS.semantic_cache_threshold",
+    "PERFORMANCE_SETTINGS.semantic_cache_max_entries", "PERFORMANCE_SETTINGS.metrics_max_requests",
+]
+
+
+def create_snapshot(model_config, model_behavior, version=0):
+    """Wrap already loaded configuration modules in a snapshot"""
+    return ConfigSnapshot(version, model_config, model_behavior, time.time())
+
+
+def load_module(name, path):
+    """Execute a configuration file as a new module object (not added to sys.modules)"""
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def get_validation_errors(module):
+    """Errors reported by a module's validate_configuration(), if it has one"""
+    validate = getattr(module, "validate_configuration", None)
+    if validate is None:
+        return []
+    return [f"{module.__name__}: {error}" for error in validate()]
+
+
+def get_config_path(module):
+    """The file an administrator edits for a configuration module
+
+    In a PyInstaller build this is the copy next to the executable, if there
+    is one; otherwise the file the module was loaded from.
+    """
+    if getattr(sys, "frozen", False):
+        path = os.path.join(os.path.dirname(sys.executable), module.__name__ + ".py")
+        if os.path.exists(path):
+            return path
+    return module.__file__
+
+
+def get_setting(module, name):
+    """Value of a setting, or of a key of a settings dictionary ("NAME.key")"""
+    name, _, key = name.partition(".")
+    value = getattr(module, name, None)
+    if key:
+        return value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def get_restart_changes(old_config, new_config, names=RESTART_SETTINGS):
+    """Names of changed settings that need a restart"""
+    return [name for name in names
+            if get_setting(old_config, name) != get_setting(new_config, name)]
+
+
+class ConfigWatcher:
+    """Polls the configuration files and reports valid new snapshots"""
+
+    def __init__(self, snapshot, on_reload, interval=2.0, on_reject=None, on_restart_needed=None):
+        self.snapshot = snapshot
+        self.on_reload = on_reload
+        self.on_reject = on_reject
+        self.on_restart_needed = on_restart_needed
+        self.interval = interval
+        modules = {
+            "model_config": snapshot.model_config,
+            "model_behavior_config": snapshot.model_behavior,
+        }
+        self.paths = {name: get_config_path(module) for name, module in modules.items()}
+        self.signatures = self.get_signatures()
+
+        # Files other than the ones the settings were loaded from (copies next
+        # to the executable) are loaded on the first check
+        for name, module in modules.items():
+            if self.paths[name] != module.__file__:
+                self.signatures[name] = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def get_signatures(self):
+        """Modification time and size of every watched file"""
+        signatures = {}
+        for name, path in self.paths.items():
+            try:
+                stat = os.stat(path)
+                signatures[name] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                signatures[name] = None
+        return signatures
+
+    def check(self):
+        """Reload if a file changed; returns the new snapshot or None"""
+        signatures = self.get_signatures()
+        if signatures == self.signatures:
+            return None
+
+        # Remember the new state even if loading fails, so a broken file is
+        # reported once and not on every poll
+        self.signatures = signatures
+
+        try:
+            model_config = load_module("model_config", self.paths["model_config"])
+            model_behavior = load_module("model_behavior_config", self.paths["model_behavior_config"])
+        except Exception as e:
+            self.reject([f"{type(e).__name__}: {e}"])
+            return None
+
+        errors = get_validation_errors(model_config) + get_validation_errors(model_behavior)
+        if errors:
+            self.reject(errors)
+            return None
+
+        restart_changes = (get_restart_changes(self.snapshot.model_config, model_config) +
+                           get_restart_changes(self.snapshot.model_behavior, model_behavior,
+                                               BEHAVIOR_RESTART_SETTINGS))
+        for name in restart_changes:
+            log_event("WARNING", "config_needs_restart", setting=name)
+
+        self.snapshot = create_snapshot(model_config, model_behavior, self.snapshot.version + 1)
+        self.on_reload(self.snapshot)
+        if restart_changes and self.on_restart_needed:
+            self.on_restart_needed(restart_changes)
+        return self.snapshot
+
+    def reject(self, errors):
+        """Report why changed files were not applied"""
+        log_event("ERROR", "config_rejected", errors=errors)
+        if self.on_reject:
+            self.on_reject(errors)
+
+    def start(self):
+        """Check for changes periodically on a background thread"""
+        if self.thread is not None or self.interval <= 0:
+            return
+
+        def run():
+            while not self.stop_event.wait(self.interval):
+                try:
+                    self.check()
+                except Exception as e:
+                    log_event("ERROR", "config_reload_failed", error=str(e))
+
+        self.thread = threading.Thread(target=run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """Stop watching"""
+        self.stop_event.set()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conversation Context for AskForHelp Chatbot
+
+Builds the "previous conversation" section of the prompt from the chat
+history, following CONTEXT_SETTINGS in model_behavior_config.py:
+- Recent messages are included word-for-word, newest first, until either
+  max_history_messages or the max_context_tokens budget is reached
+- Older messages are compacted into a short summary in the background
+- The conversation is forgotten after forget_after_hours of inactivity
+"""
+
+import threading
+import time
+
+import model_behavior_config
+
+
+# Longest text kept from a single message in the summary
+SUMMARY_SNIPPET_LENGTH = 120
+
+
+def summarize_turns(turns):
+    """Compact old turns into short one-line notes (first sentence of each message)"""
+    notes = []
+    for turn in turns:
+        text = " ".join(turn['message'].split())
+        sentence = text.split(". ")[0]
+        if len(sentence) > SUMMARY_SNIPPET_LENGTH:
+            sentence = sentence[:SUMMARY_SNIPPET_LENGTH].rstrip() + "..."
+        speaker = "User" if turn['sender'] == "You" else "Assistant"
+        notes.append(f"- {speaker}: {sentence}")
+    return notes
+
+
+class ConversationContext:
+    """Packs recent chat history into the prompt within a token budget"""
+
+    def __init__(self, settings=None, summarizer=None):
+        self.summarizer = summarizer or summarize_turns
+        self.configure(settings)
+
+        self.lock = threading.Lock()
+        self.reset()
+
+    def configure(self, settings=None):
+        """Apply CONTEXT_SETTINGS (also used when the configuration is reloaded)"""
+        settings = settings or model_behavior_config.CONTEXT_SETTINGS
+        self.max_messages = settings.get("max_history_messages", 10)
+        self.summarize_old = settings.get("summarize_old_messages", True)
+        self.forget_after_seconds = settings.get("forget_after_hours", 24) * 3600
+        self.max_tokens = settings.get("max_context_tokens", 1024)
+
+        # The summary may use at most a quarter of the token budget
+        self.summary_tokens = self.max_tokens // 4
+
+    def reset(self, session_start=0):
+        """Forget the conversation (messages before session_start are ignored)"""
+        with self.lock:
+            self.session_start = session_start
+            self.summary = ""
+            self.last_activity = time.time()
+
+    def is_expired(self):
+        """Check whether the conversation has been idle longer than forget_after_hours"""
+        return time.time() - self.last_activity > self.forget_after_seconds
+
+    def touch(self, chat_history):
+        """Record activity, starting a new session first if the old one expired"""
+        if self.is_expired():
+            self.reset(session_start=len(chat_history))
+        else:
+            self.last_activity = time.time()
+
+    def get_turns(self, chat_history):
+        """Get the user/assistant messages of the current session"""
+        return [msg for msg in chat_history[self.session_start:] if not msg['is_system']]
+
+    def has_history(self, chat_history):
+        """Check whether the current session already has messages"""
+        return bool(self.get_turns(chat_history))
+
+    def format_turn(self, turn):
+        """Format one message for the prompt"""
+        speaker = "User" if turn['sender'] == "You" else "Assistant"
+        return f"{speaker}: {turn['message'].strip()}"
+
+    def select_recent(self, turns, budget):
+        """Pick the newest turns that fit the message limit and token budget"""
+        selected = []
+        used = 0
+        for turn in reversed(turns[-self.max_messages:] if self.max_messages > 0 else []):
+            tokens = model_behavior_config.estimate_tokens(self.format_turn(turn))
+            if used + tokens > budget:
+                break
+            selected.append(turn)
+            used += tokens
+        selected.reverse()
+        return selected
+
+    def select(self, chat_history):
+        """Get (summary, recent turns) to send with the next question"""
+        turns = self.get_turns(chat_history)
+        if not turns:
+            return "", []
+
+        with self.lock:
+            summary = self.summary if self.summarize_old else ""
+
+        budget = self.max_tokens - model_behavior_config.estimate_tokens(summary)
+        recent = self.select_recent(turns, budget)
+
+        # The summary is only needed when older turns were left out
+        if len(recent) == len(turns):
+            summary = ""
+        return summary, recent
+
+    def build(self, chat_history):
+        """Build the conversation history section of the prompt ("" for a new conversation)"""
+        summary, recent = self.select(chat_history)
+
+        # Nothing fits (e.g. one very long message) and nothing was summarized
+        if not recent and not summary:
+            return ""
+
+        section = "Previous Conversation:\n"
+        if summary:
+            section += f"Summary of earlier messages:\n{summary}\n"
+        for turn in recent:
+            section += self.format_turn(turn) + "\n"
+        return section + "\n"
+
+    def build_messages(self, chat_history):
+        """Build the conversation history as /api/chat messages"""
+        summary, recent = self.select(chat_history)
+
+        messages = []
+        if summary:
+            messages.append({"role": "system", "content": f"Summary of earlier messages:\n{summary}"})
+        for turn in recent:
+            role = "user" if turn['sender'] == "You" else "assistant"
+            messages.append({"role": role, "content": turn['message']})
+        return messages
+
+    def compact(self, chat_history):
+        """Summarize turns that no longer fit in the recent window"""
+        if not self.summarize_old:
+            return
+
+        turns = self.get_turns(chat_history)
+        recent = self.select_recent(turns, self.max_tokens - self.summary_tokens)
+        old_turns = turns[:len(turns) - len(recent)]
+        if not old_turns:
+            return
+
+        # Keep the newest notes that fit the summary budget
+        notes = []
+        used = 0
+        for note in reversed(self.summarizer(old_turns)):
+            tokens = model_behavior_config.estimate_tokens(note)
+            if used + tokens > self.summary_tokens:
+                break
+            notes.append(note)
+            used += tokens
+        notes.reverse()
+
+        with self.lock:
+            self.summary = "\n".join(notes)
+
+    def compact_in_background(self, chat_history):
+        """Run compact() on a worker thread so it never delays an answer"""
+        history = list(chat_history)
+        thread = threading.Thread(target=self.compact, args=(history,))
+        thread.daemon = True
+        thread.start()
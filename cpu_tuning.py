@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU Inference Tuning for AskForHelp Chatbot
+
+Picks Ollama's num_thread, num_ctx and num_batch options for CPU-only
+machines instead of relying on the server defaults:
+- num_thread: one thread per physical core (hyper-threads only add contention)
+- num_ctx: the smallest power of two that fits our longest prompt plus the
+  longest answer, so no memory is spent on a context window we never use
+- num_batch: how many prompt tokens are evaluated per step, lowered on
+  machines with little memory
+
+Options are only auto-tuned when Ollama runs on this machine (otherwise
+this machine's hardware says nothing about the server). Values set in
+CPU_TUNING in model_config.py are always used as given.
+
+num_ctx is computed once and then kept for every request: Ollama reloads
+the model whenever num_ctx changes.
+"""
+
+import os
+import socket
+from urllib.parse import urlsplit
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# Smallest and largest context window chosen automatically
+MIN_CONTEXT = 1024
+MAX_CONTEXT = 8192
+
+# Tokens allowed for the user's question on top of the template and history
+QUESTION_TOKENS = 256
+
+
+def get_physical_cores():
+    """Number of physical CPU cores (falls back to logical cores)"""
+    if psutil is not None:
+        cores = psutil.cpu_count(logical=False)
+        if cores:
+            return cores
+
+    # Linux: count unique (physical id, core id) pairs
+    try:
+        cores = set()
+        physical_id = "0"
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                key = key.strip()
+                if key == "physical id":
+                    physical_id = value.strip()
+                elif key == "core id":
+                    cores.add((physical_id, value.strip()))
+        if cores:
+            return len(cores)
+    except OSError:
+        pass
+
+    return os.cpu_count() or 1
+
+
+def get_memory_gb():
+    """Total memory of this machine in GB, or None if unknown"""
+    if psutil is not None:
+        return psutil.virtual_memory().total / 1024 ** 3
+
+    try:
+        with open("/proc/meminfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) / 1024 ** 2
+    except OSError:
+        pass
+
+    if os.name == "nt":
+        try:
+            import ctypes
+
+            class MemoryStatus(ctypes.Structure):
+                _fields_ = [
+                    ("dwLength", ctypes.c_ulong),
+                    ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong),
+                    ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong),
+                    ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong),
+                    ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+                ]
+
+            status = MemoryStatus()
+            status.dwLength = ctypes.sizeof(MemoryStatus)
+            if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(status)):
+                return status.ullTotalPhys / 1024 ** 3
+        except Exception:
+            pass
+
+    return None
+
+
+def is_local_url(url):
+    """Check whether an Ollama URL points at this machine"""
+    host = (urlsplit(url).hostname or "").lower()
+    return host in ("localhost", "127.0.0.1", "::1", "0.0.0.0", socket.gethostname().lower())
+
+
+def choose_context_size(prompt_tokens, answer_tokens):
+    """Smallest power of two holding the prompt and the answer"""
+    needed = prompt_tokens + answer_tokens
+    num_ctx = MIN_CONTEXT
+    while num_ctx < needed and num_ctx < MAX_CONTEXT:
+        num_ctx *= 2
+    return num_ctx
+
+
+def choose_options(physical_cores, memory_gb, prompt_tokens, answer_tokens):
+    """CPU options for the given hardware and prompt size"""
+    num_ctx = choose_context_size(prompt_tokens, answer_tokens)
+    num_batch = 256 if memory_gb is not None and memory_gb < 8 else 512
+    return {
+        "num_thread": max(1, physical_cores),
+        "num_ctx": num_ctx,
+        "num_batch": min(num_batch, num_ctx),
+    }
+
+
+def get_prompt_budget(prompt_builder, context_tokens):
+    """Largest prompt we send: longest fixed template text, history budget and question"""
+    report = prompt_builder.get_token_report()
+    template_tokens = max(info["shared_prefix_tokens"] for info in report.values())
+    return template_tokens + context_tokens + QUESTION_TOKENS
+
+
+def get_cpu_options(urls, settings, prompt_tokens, answer_tokens):
+    """Options to add to every request (empty when tuning is off)
+
+    Auto-tuned values are only used when every server is local; values set
+    in settings always win.
+    """
+    if not settings.get("enabled", True):
+        return {}
+
+    options = {}
+    if all(is_local_url(url) for url in urls) or settings.get("tune_remote", False):
+        options = choose_options(get_physical_cores(), get_memory_gb(), prompt_tokens, answer_tokens)
+
+    for key in ("num_thread", "num_ctx", "num_batch"):
+        if settings.get(key):
+            options[key] = settings[key]
+    return options
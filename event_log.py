@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Event Log for AskForHelp Chatbot
+
+Structured JSONL log of requests, responses, errors, cache hits,
+escalations and server events. The packaged application has no console,
+so this file is where its diagnostics end up.
+
+Logging never blocks the caller: events are put on a queue and written in
+batches by a background thread. When the file grows past max_bytes it is
+rotated and compressed with gzip; only the newest backup_count compressed
+files are kept. If the queue is full (the disk can't keep up), events are
+dropped and counted instead of slowing down the application.
+
+Settings (model_behavior_config.py): LOG_LEVEL, LOG_RESPONSES, DEBUG_MODE,
+LOG_FILE, LOG_MAX_BYTES and LOG_BACKUP_COUNT. Until configure() is called,
+events are printed to the console.
+"""
+
+import atexit
+import datetime
+import glob
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+
+
+LEVELS = {
+    "DEBUG": 10,
+    "INFO": 20,
+    "WARNING": 30,
+    "ERROR": 40,
+}
+
+
+def format_event(level, event, fields):
+    """One log record as a dictionary"""
+    record = {
+        "ts": datetime.datetime.now().isoformat(timespec="milliseconds"),
+        "level": level,
+        "event": event,
+    }
+    record.update(fields)
+    return record
+
+
+class EventLog:
+    """Buffered JSONL event log with a background writer"""
+
+    def __init__(self, path, level="INFO", max_bytes=5 * 1024 * 1024, backup_count=5,
+                 echo=False, flush_interval=1.0, queue_size=10000):
+        self.path = path
+        self.level = LEVELS.get(level, LEVELS["INFO"])
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.echo = echo
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.thread = None
+        self.file = None
+
+    def set_level(self, level, echo=None):
+        """Change the minimum level (e.g. after a configuration reload)"""
+        self.level = LEVELS.get(level, self.level)
+        if echo is not None:
+            self.echo = echo
+
+    def is_enabled(self, level):
+        """Check whether events of this level are recorded"""
+        return LEVELS.get(level, 0) >= self.level
+
+    def log(self, level, event, **fields):
+        """Queue an event (never blocks)"""
+        if not self.is_enabled(level):
+            return
+
+        record = format_event(level, event, fields)
+        if self.echo:
+            print(f"[{level}] {event}: {fields}")
+
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        """Start the writer thread"""
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+        atexit.register(self.close)
+
+    def run(self):
+        """Writer thread: write queued events in batches"""
+        while True:
+            try:
+                batch = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+
+            # Take everything else that is already waiting
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = None in batch
+            records = [record for record in batch if record is not None]
+            if self.dropped:
+                records.append(format_event("WARNING", "events_dropped", {"count": self.dropped}))
+                self.dropped = 0
+
+            try:
+                self.write(records)
+            except Exception as e:
+                print(f"Event log write failed: {e}")
+
+            if stop:
+                if self.file is not None:
+                    self.file.close()
+                    self.file = None
+                return
+
+    def write(self, records):
+        """Append records to the log file, rotating it when it is too large"""
+        if not records:
+            return
+        if self.file is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.file = open(self.path, 'a', encoding='utf-8')
+
+        self.file.write("".join(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in records))
+        self.file.flush()
+
+        if self.file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        """Compress the current file into a timestamped .gz and start a new one"""
+        self.file.close()
+        self.file = None
+
+        base, extension = os.path.splitext(self.path)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        rotated = f"{base}.{stamp}{extension}"
+        os.replace(self.path, rotated)
+
+        with open(rotated, 'rb') as source, gzip.open(rotated + ".gz", 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.remove(rotated)
+
+        # Keep only the newest backup_count compressed files
+        backups = sorted(glob.glob(f"{glob.escape(base)}.*{extension}.gz"))
+        for old in backups[:-self.backup_count] if self.backup_count > 0 else backups:
+            os.remove(old)
+
+    def close(self, timeout=2.0):
+        """Write what is still queued and stop the writer"""
+        if self.thread is None or not self.thread.is_alive():
+            return
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+
+# The application's event log (set by configure())
+EVENT_LOG = None
+
+
+def configure(behavior):
+    """Start the event log using the logging settings of model_behavior_config"""
+    global EVENT_LOG
+    level = "DEBUG" if behavior.DEBUG_MODE else behavior.LOG_LEVEL
+    if EVENT_LOG is None:
+        EVENT_LOG = EventLog(
+            behavior.LOG_FILE,
+            level=level,
+            max_bytes=behavior.LOG_MAX_BYTES,
+            backup_count=behavior.LOG_BACKUP_COUNT,
+            echo=behavior.DEBUG_MODE
+        )
+        EVENT_LOG.start()
+    else:
+        EVENT_LOG.set_level(level, echo=behavior.DEBUG_MODE)
+    return EVENT_LOG
+
+
+def log_event(level, event, **fields):
+    """Record an event in the application's log (printed if the log isn't configured)"""
+    if EVENT_LOG is None:
+        print(f"[{level}] {event}: {fields}" if fields else f"[{level}] {event}")
+        return
+    EVENT_LOG.log(level, event, **fields)
+
+
+def is_enabled(level):
+    """Check whether events of this level are recorded (to skip building costly fields)"""
+    return EVENT_LOG is None or EVENT_LOG.is_enabled(level)
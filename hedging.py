@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hedged Requests for AskForHelp Chatbot
+
+CPU inference has a long tail: now and then an answer takes several times
+longer than usual to start. With hedging, if the first request has not
+produced its first token within a deadline (set it to your p95
+time-to-first-token), the same prompt is also sent to a second server or a
+lighter model. Whichever starts answering first is used; the other request
+is cancelled so it doesn't keep a server busy.
+
+The backup request needs a request scheduler slot of its own, so hedging
+never sends more than MAX_CONCURRENT_REQUESTS to the servers: without a free
+slot (or while other questions are queued) the first request is waited for.
+A backup sent because the first request failed takes over that request's
+slot instead.
+"""
+
+import queue
+import threading
+import time
+
+from event_log import log_event
+from ollama_client import RequestCancelled, RequestHandle, get_chunk_text
+
+
+# How often the hedged stream checks the deadline and the Stop button
+POLL_SECONDS = 0.1
+
+
+class HedgeAttempt:
+    """One of the competing requests in a HedgedStream"""
+
+    def __init__(self, name, start):
+        self.name = name
+        self.start = start
+        self.handle = RequestHandle()
+        self.finished = False
+
+
+class HedgedStream:
+    """Iterates over the chunks of whichever request produces the first token
+
+    start_primary and start_secondary are callables taking a RequestHandle and
+    returning an iterator of Ollama stream chunks. The primary request runs in
+    the caller's scheduler slot; a hedged secondary takes a free slot of the
+    scheduler (if given) or is not sent.
+    """
+
+    def __init__(self, start_primary, start_secondary, deadline, handle, scheduler=None):
+        self.start_primary = start_primary
+        self.start_secondary = start_secondary
+        self.deadline = deadline
+        self.handle = handle
+        self.scheduler = scheduler
+        self.events = queue.Queue()
+        self.attempts = []
+        self.winner = None
+        self.slot_missing = False
+
+    def launch(self, name, start, holds_slot=False):
+        """Start an attempt on its own thread (holds_slot: release a scheduler slot when done)"""
+        attempt = HedgeAttempt(name, start)
+        self.attempts.append(attempt)
+
+        def run():
+            try:
+                for chunk in attempt.start(attempt.handle):
+                    self.events.put((attempt, "chunk", chunk))
+                self.events.put((attempt, "end", None))
+            except Exception as e:
+                self.events.put((attempt, "error", e))
+            finally:
+                if holds_slot:
+                    self.scheduler.release()
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        return attempt
+
+    def take_slot(self):
+        """Take a scheduler slot for a backup request; False if none is free"""
+        if self.scheduler is None or self.scheduler.try_acquire():
+            return True
+        if not self.slot_missing:
+            self.slot_missing = True
+            log_event("INFO", "hedge_delayed", reason="no free request slot")
+        return False
+
+    def cancel_others(self, keep=None):
+        """Cancel every attempt except keep"""
+        for attempt in self.attempts:
+            if attempt is not keep:
+                attempt.handle.cancel()
+
+    def close(self):
+        """Cancel all attempts"""
+        self.cancel_others()
+
+    def __iter__(self):
+        self.launch("primary", self.start_primary)
+        hedge_at = time.perf_counter() + self.deadline
+        secondary = None
+        errors = []
+
+        while True:
+            if self.handle.is_cancelled():
+                self.close()
+                raise RequestCancelled()
+
+            try:
+                attempt, kind, value = self.events.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                # No token yet: fire the backup request once the deadline passes
+                if self.winner is None and secondary is None and time.perf_counter() >= hedge_at:
+                    if self.take_slot():
+                        secondary = self.launch("secondary", self.start_secondary,
+                                                holds_slot=self.scheduler is not None)
+                continue
+
+            if self.winner is None:
+                if kind == "chunk" and (get_chunk_text(value) or value.get('done')):
+                    # First real token decides the race
+                    self.winner = attempt
+                    self.cancel_others(keep=attempt)
+                elif kind in ("error", "end"):
+                    attempt.finished = True
+                    if kind == "error":
+                        errors.append(value)
+
+                    # A failed primary doesn't have to wait for the deadline
+                    if secondary is None:
+                        secondary = self.launch("secondary", self.start_secondary)
+                        continue
+                    if all(a.finished for a in self.attempts):
+                        if errors:
+                            raise errors[0]
+                        return
+                    continue
+                else:
+                    continue
+
+            if attempt is not self.winner:
+                continue
+
+            if kind == "chunk":
+                yield value
+            elif kind == "end":
+                return
+            else:
+                raise value
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Request Metrics for AskForHelp Chatbot
+
+Records where the time goes for every question answered in this session:
+- client side: queue wait, connect time (until Ollama's response headers),
+  time to first token, total time and UI render time
+- server side: Ollama's own timing fields (total, model load, prompt
+  evaluation and generation durations and token counts)
+
+The most recent requests are kept in memory; p50/p95 per field are shown
+in the admin view (Ctrl+Shift+M in the main window).
+"""
+
+import collections
+import threading
+import time
+
+
+# Fields summarized in the admin view, with their labels
+FIELDS = [
+    ("queue_wait_ms", "Queue wait (ms)"),
+    ("connect_ms", "Connect / headers (ms)"),
+    ("ttft_ms", "Time to first token (ms)"),
+    ("total_ms", "Total client time (ms)"),
+    ("render_ms", "UI render time (ms)"),
+    ("server_total_ms", "Ollama total (ms)"),
+    ("load_ms", "Model load (ms)"),
+    ("prompt_eval_ms", "Prompt eval (ms)"),
+    ("prompt_tokens", "Prompt tokens"),
+    ("eval_ms", "Generation (ms)"),
+    ("eval_tokens", "Generated tokens"),
+    ("prompt_tokens_per_second", "Prompt tokens/s"),
+    ("eval_tokens_per_second", "Generated tokens/s"),
+]
+
+
+def get_ollama_timings(result):
+    """Ollama's timing fields of a finished response, in milliseconds and tokens"""
+    timings = {}
+    for field, name in (("total_duration", "server_total_ms"), ("load_duration", "load_ms"),
+                        ("prompt_eval_duration", "prompt_eval_ms"), ("eval_duration", "eval_ms")):
+        if field in result:
+            timings[name] = result[field] / 1e6
+
+    if "prompt_eval_count" in result:
+        timings["prompt_tokens"] = result["prompt_eval_count"]
+    if "eval_count" in result:
+        timings["eval_tokens"] = result["eval_count"]
+
+    if timings.get("prompt_eval_ms"):
+        timings["prompt_tokens_per_second"] = timings.get("prompt_tokens", 0) / (timings["prompt_eval_ms"] / 1000)
+    if timings.get("eval_ms"):
+        timings["eval_tokens_per_second"] = timings.get("eval_tokens", 0) / (timings["eval_ms"] / 1000)
+    return timings
+
+
+def percentile(sorted_values, fraction):
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class RequestMetrics:
+    """Timings of one question, filled in as the request progresses"""
+
+    def __init__(self, model=None):
+        self.started = time.perf_counter()
+        self.values = {"timestamp": time.time(), "model": model, "source": "model"}
+
+    def elapsed_ms(self):
+        """Milliseconds since the question was sent"""
+        return (time.perf_counter() - self.started) * 1000
+
+    def mark(self, name):
+        """Record the time since the question was sent under name (first call wins)"""
+        if name not in self.values:
+            self.values[name] = self.elapsed_ms()
+
+    def set(self, name, value):
+        """Record a value"""
+        self.values[name] = value
+
+    def add(self, name, value):
+        """Add to a running total (e.g. render time over several UI updates)"""
+        self.values[name] = self.values.get(name, 0.0) + value
+
+    def finish(self, result=None):
+        """Record the total time and Ollama's timing fields"""
+        self.values["total_ms"] = self.elapsed_ms()
+        if result:
+            self.values.update(get_ollama_timings(result))
+
+
+class MetricsStore:
+    """The metrics of the most recent requests of this session"""
+
+    def __init__(self, max_requests=1000):
+        self.lock = threading.Lock()
+        self.requests = collections.deque(maxlen=max_requests)
+        self.session_start = time.time()
+
+    def add(self, metrics):
+        """Keep a finished request's metrics"""
+        with self.lock:
+            self.requests.append(metrics)
+
+    def records(self):
+        """All kept requests as dictionaries"""
+        with self.lock:
+            return [dict(metrics.values) for metrics in self.requests]
+
+    def summary(self, source=None):
+        """Count, p50, p95 and mean of every field (optionally for one answer source)"""
+        records = [r for r in self.records() if source is None or r["source"] == source]
+        summary = {}
+        for field, label in FIELDS:
+            values = sorted(r[field] for r in records if r.get(field) is not None)
+            if not values:
+                continue
+            summary[field] = {
+                "label": label,
+                "count": len(values),
+                "p50": percentile(values, 0.50),
+                "p95": percentile(values, 0.95),
+                "mean": sum(values) / len(values),
+            }
+        return summary
+
+    def source_counts(self):
+        """How many questions were answered by the model, caches, rules or offline"""
+        return collections.Counter(r["source"] for r in self.records())
+
+    def format_report(self):
+        """Plain-text table for the admin view"""
+        records = self.records()
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.session_start))
+        lines = [f"Session started: {started}", f"Requests recorded: {len(records)}"]
+        for source, count in sorted(self.source_counts().items()):
+            lines.append(f"  {source}: {count}")
+
+        lines.append("")
+        lines.append(f"{'Metric (answers from the model)':<32} {'count':>6} {'p50':>10} {'p95':>10} {'mean':>10}")
+        lines.append("-" * 72)
+        for field, stats in self.summary(source="model").items():
+            lines.append(f"{stats['label']:<32} {stats['count']:>6} {stats['p50']:>10.1f} "
+                         f"{stats['p95']:>10.1f} {stats['mean']:>10.1f}")
+
+        other = self.summary(source=None).get("total_ms")
+        if other:
+            lines.append("")
+            lines.append(f"All answers, total client time: p50 {other['p50']:.1f} ms, p95 {other['p95']:.1f} ms")
+        return "\n".join(lines)
@@ -6,6 +6,12 @@ Configuration file for adjusting LLM model behavior to provide better informatio
 This file contains parameters and settings that can be tuned to optimize AI responses.
 """
 
+import re
+import string
+import threading
+
+from event_log import log_event
+
 # ============================================================================
 # RESPONSE GENERATION PARAMETERS
 # ============================================================================
@@ -25,8 +31,13 @@ TOP_P = 0.9
 # - Short: 512 tokens (brief responses)
 # - Medium: 1024 tokens (standard responses)
 # - Long: 2048 tokens (detailed explanations)
+# Sent to Ollama as "num_predict"; the server stops generating at this length
 MAX_TOKENS = 1024
 
+# Output guard: the client also stops reading an answer that runs past
+# MAX_TOKENS by this factor (e.g. a server that ignores num_predict)
+MAX_TOKENS_GUARD = 1.1
+
 # Frequency penalty: Reduce repetition
 # - Positive values penalize frequent tokens
 # - Range: -2.0 to 2.0
@@ -37,6 +48,10 @@ FREQUENCY_PENALTY = 0.5
 # - Range: -2.0 to 2.0
 PRESENCE_PENALTY = 0.3
 
+# Repeat penalty: Ollama's own repetition control
+# - 1.0 = off, 1.1 = light (Ollama default), 1.3+ = strong
+REPEAT_PENALTY = 1.1
+
 # ============================================================================
 # RESPONSE STYLE PARAMETERS
 # ============================================================================
@@ -70,9 +85,38 @@ FORMATTING_PREFERENCES = {
 # SYSTEM PROMPT TEMPLATES
 # ============================================================================
 
+# Prompt layout: keep the fixed instructions at the top and the per-user and
+# per-question fields ({username}, {user_message}, ...) at the bottom.
+# Ollama can then reuse its cached evaluation of the shared beginning of the
+# prompt across users and questions. See PROMPT_BUILDER below.
+
 # Base system prompt template
 SYSTEM_PROMPT_TEMPLATE = """You are AskForHelp, a PC hardware and software support assistant for ITSU IT support.
 
+IMPORTANT RULES:
+1. You ONLY answer questions about PC hardware and software issues
+2. NEVER ask users to perform actions requiring admin rights
+3. NEVER ask users to modify Windows system files or settings
+4. NEVER ask users to update software/drivers themselves
+5. For ANY task requiring admin rights or system modification, ALWAYS guide them to create an IT support ticket
+6. For non-PC questions, explain your scope limitation and guide them to submit an IT ticket
+7. Refer to AI_GUIDANCE.md for complete guidance on response protocols and limitations
+
+For PC hardware/software questions:
+- Provide helpful troubleshooting steps that don't require admin rights
+- Ask clarifying questions
+- Suggest safe, non-invasive solutions
+- For complex issues or anything requiring admin rights, guide them to create a ticket for further assistance
+
+For issues requiring admin rights or system modification:
+- Politely explain that this requires IT administrator assistance
+- Guide them to create an IT support ticket immediately
+- Do NOT provide step-by-step instructions for admin tasks
+
+For non-PC questions:
+- Explain your scope limitation
+- Guide them to submit an IT ticket for help
+
 System Information:
 - Username: {username}
 - Hostname: {hostname}
@@ -80,7 +124,14 @@ System Information:
 - IP Address: {ip_address}
 - Timestamp: {timestamp}
 
-User Question: {user_message}
+{conversation_history}User Question: {user_message}
+
+Response:"""
+
+# System message for chat mode (API_MODE = "chat" in model_config.py)
+# The conversation and the user's question are sent as separate chat messages,
+# so this text stays the same for the whole session and Ollama can keep it cached.
+CHAT_SYSTEM_PROMPT_TEMPLATE = """You are AskForHelp, a PC hardware and software support assistant for ITSU IT support.
 
 IMPORTANT RULES:
 1. You ONLY answer questions about PC hardware and software issues
@@ -106,20 +157,23 @@ For non-PC questions:
 - Explain your scope limitation
 - Guide them to submit an IT ticket for help
 
-Response:"""
+System Information:
+- Username: {username}
+- Hostname: {hostname}
+- OS: {os_info}"""
 
 # Alternative prompt templates for different scenarios
 ALTERNATIVE_PROMPTS = {
     # For quick, concise responses
     "concise": """You are AskForHelp, a PC hardware and software support assistant.
 
-User: {user_message}
-
 Rules:
 - Only PC hardware/software questions
 - No admin rights instructions
 - Guide to IT ticket for complex issues
 
+User: {user_message}
+
 Response:""",
     
     # For detailed, educational responses
@@ -127,13 +181,6 @@ Response:""",
 
 Your goal is to educate users about their PC issues while maintaining safety.
 
-System Info:
-- User: {username}
-- Host: {hostname}
-- OS: {os_info}
-
-User Question: {user_message}
-
 Guidelines:
 1. Explain the issue in simple terms
 2. Provide safe troubleshooting steps
@@ -141,23 +188,194 @@ Guidelines:
 4. Guide to IT ticket when needed
 5. Be educational but concise
 
+System Info:
+- User: {username}
+- Host: {hostname}
+- OS: {os_info}
+
+User Question: {user_message}
+
 Response:""",
     
     # For urgent issues
     "urgent": """You are AskForHelp, a PC hardware and software support assistant.
 
-URGENT ISSUE DETECTED: {user_message}
-
-Immediate Actions:
+For urgent issues, take these immediate actions:
 1. Acknowledge the urgency
 2. Explain why this needs immediate IT attention
 3. Guide user to create IT ticket IMMEDIATELY
 4. Do NOT provide troubleshooting steps
 5. Emphasize the importance of professional assistance
 
+URGENT ISSUE DETECTED: {user_message}
+
 Response:""",
 }
 
+# ============================================================================
+# PROMPT BUILDER
+# ============================================================================
+
+class PromptTemplate:
+    """A prompt template compiled once: its fields, static prefix and token cost"""
+
+    def __init__(self, name, template):
+        self.name = name
+        self.template = template
+        self.fields = []
+        self.static_prefix = None
+
+        # Split the template into literal text and {fields} once, up front
+        for literal, field, _, _ in string.Formatter().parse(template):
+            if self.static_prefix is None:
+                self.static_prefix = literal
+            if field and field not in self.fields:
+                self.fields.append(field)
+
+        self.static_prefix = self.static_prefix or ""
+        self.static_prefix_tokens = estimate_tokens(self.static_prefix)
+
+    def render(self, **values):
+        """Fill in the template fields"""
+        return self.template.format(**values)
+
+
+class AssembledPrompt:
+    """A filled-in prompt with its token accounting"""
+
+    def __init__(self, template, text):
+        self.name = template.name
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.shared_prefix_tokens = template.static_prefix_tokens
+        self.dynamic_tokens = self.tokens - self.shared_prefix_tokens
+
+
+class PromptBuilder:
+    """Compiles the prompt templates once and tracks the token cost of each"""
+
+    def __init__(self, templates):
+        self.templates = {name: PromptTemplate(name, text) for name, text in templates.items()}
+        self.lock = threading.Lock()
+        self.stats = {name: {"count": 0, "total_tokens": 0, "last_tokens": 0} for name in self.templates}
+
+    def build(self, name, **values):
+        """Assemble a prompt from a compiled template and record its token count"""
+        prompt = AssembledPrompt(self.templates[name], self.templates[name].render(**values))
+
+        with self.lock:
+            stats = self.stats[name]
+            stats["count"] += 1
+            stats["total_tokens"] += prompt.tokens
+            stats["last_tokens"] = prompt.tokens
+
+        log_event("DEBUG", "prompt", name=name, tokens=prompt.tokens,
+                  shared_prefix_tokens=prompt.shared_prefix_tokens, dynamic_tokens=prompt.dynamic_tokens)
+        return prompt
+
+    def get_token_report(self):
+        """Token cost per template: shared prefix, last and average assembled size"""
+        report = {}
+        with self.lock:
+            for name, template in self.templates.items():
+                stats = self.stats[name]
+                report[name] = {
+                    "fields": list(template.fields),
+                    "shared_prefix_tokens": template.static_prefix_tokens,
+                    "last_tokens": stats["last_tokens"],
+                    "average_tokens": round(stats["total_tokens"] / stats["count"]) if stats["count"] else 0,
+                    "prompts_built": stats["count"],
+                }
+        return report
+
+
+def get_prompt_templates():
+    """All prompt templates by name"""
+    templates = {
+        "system": SYSTEM_PROMPT_TEMPLATE,
+        "chat_system": CHAT_SYSTEM_PROMPT_TEMPLATE,
+    }
+    templates.update(ALTERNATIVE_PROMPTS)
+    return templates
+
+# ============================================================================
+# KEYWORD MATCHER
+# ============================================================================
+
+# Endings allowed after a keyword, so "restart" also matches "restarting"
+KEYWORD_SUFFIXES = ["s", "es", "ed", "ing"]
+
+
+class KeywordMatcher:
+    """Matches thousands of keywords in one pass with a single compiled regex
+    
+    The keywords are merged into a character trie, and the trie is turned into
+    one regular expression, so the cost of a search barely grows with the
+    number of keywords. Matches must start and end on word boundaries
+    ("admin" does not match "badminton"); spaces inside a keyword match any
+    whitespace, and the endings in KEYWORD_SUFFIXES are allowed.
+    """
+
+    def __init__(self, categories):
+        self.term_categories = {}
+        trie = {}
+        for category, terms in categories.items():
+            for term in terms:
+                term = " ".join(term.lower().split())
+                if not term:
+                    continue
+                self.term_categories.setdefault(term, [])
+                if category not in self.term_categories[term]:
+                    self.term_categories[term].append(category)
+
+                node = trie
+                for char in term:
+                    node = node.setdefault(char, {})
+                node[""] = True
+
+        suffixes = "|".join(re.escape(suffix) for suffix in KEYWORD_SUFFIXES)
+        if trie:
+            pattern = rf"(?<!\w)({self.trie_to_regex(trie)})(?:{suffixes})?(?!\w)"
+        else:
+            pattern = r"(?!x)x"  # matches nothing
+        self.regex = re.compile(pattern)
+
+    def trie_to_regex(self, node):
+        """Convert a trie node into a regex (longer keywords are tried first)"""
+        branches = []
+        for char in sorted(key for key in node if key):
+            if char == " ":
+                prefix = r"\s+"
+            else:
+                prefix = re.escape(char)
+            branches.append(prefix + self.trie_to_regex(node[char]))
+
+        if not branches:
+            return ""
+        if len(branches) == 1:
+            result = branches[0]
+            if "" in node:
+                return f"(?:{result})?"
+            return result
+        result = "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            result += "?"
+        return result
+
+    def find_all(self, text):
+        """All (category, term) pairs found in the text"""
+        matches = []
+        for match in self.regex.finditer(text.lower()):
+            term = " ".join(match.group(1).split())
+            for category in self.term_categories.get(term, []):
+                matches.append((category, term))
+        return matches
+
+    def search(self, text):
+        """The first (category, term) found in the text, or None"""
+        matches = self.find_all(text)
+        return matches[0] if matches else None
+
 # ============================================================================
 # BEHAVIOR GUIDELINES
 # ============================================================================
@@ -182,6 +400,42 @@ ESCALATION_TRIGGERS = [
     "firewall", "antivirus", "security policy", "system policy",
 ]
 
+# Admin tasks answered at once with the admin_required template, without
+# calling the model, and how the answer describes them. Only unambiguous
+# requests belong here: a generic trigger such as "change settings" or
+# "bios" alone ("How do I change settings for my mouse?") is left to the
+# model, which still gets the escalation guidance in its prompt.
+ADMIN_REQUIRED_TASKS = {
+    "admin rights": "getting administrator rights",
+    "administrator rights": "getting administrator rights",
+    "admin password": "the administrator password",
+    "administrator password": "the administrator password",
+    "run as administrator": "running a program as administrator",
+    "install software": "installing software",
+    "installing software": "installing software",
+    "software installation": "installing software",
+    "install driver": "installing a driver",
+    "update driver": "updating a driver",
+    "driver update": "updating a driver",
+    "update bios": "updating the BIOS",
+    "bios update": "updating the BIOS",
+    "bios password": "the BIOS password",
+    "update firmware": "updating firmware",
+    "firmware update": "updating firmware",
+    "edit registry": "editing the registry",
+    "registry edit": "editing the registry",
+    "group policy": "group policy settings",
+    "system files": "system files",
+    "disable firewall": "the firewall settings",
+    "firewall settings": "the firewall settings",
+    "disable antivirus": "the antivirus settings",
+    "antivirus settings": "the antivirus settings",
+    "security policy": "a security policy",
+    "system policy": "a system policy",
+    "data recovery": "recovering data",
+    "backup restore": "restoring a backup",
+}
+
 # Safe troubleshooting keywords (can provide guidance)
 SAFE_TROUBLESHOOTING = [
     "restart", "reboot", "close program", "clear cache", "check connection",
@@ -230,7 +484,7 @@ ALWAYS_ESCALATE = [
 # ============================================================================
 
 # Template for admin rights required
-TEMPLATE_ADMIN_REQUIRED = """I understand you're experiencing {issue}. This requires administrative privileges to resolve. Please click the "Generate IT Ticket" button to create a support request, and our IT team will assist you with this issue."""
+TEMPLATE_ADMIN_REQUIRED = """I understand you need help with {issue}. This requires administrative privileges to resolve. Please click the "Generate IT Ticket" button to create a support request, and our IT team will assist you with this issue."""
 
 # Template for outside scope
 TEMPLATE_OUTSIDE_SCOPE = """I'm specialized in PC hardware and software support. For questions about {topic}, please click "Generate IT Ticket" to submit your request to our IT support team who can better assist you."""
@@ -254,6 +508,24 @@ This will help me guide you to the right solution or create an appropriate IT ti
 # Template for urgent issues
 TEMPLATE_URGENT = """This appears to be an urgent issue. Please click "Generate IT Ticket" immediately to create a high-priority support request. Our IT team will respond as soon as possible."""
 
+# Template used when the AI server cannot be reached and no cached answer exists
+TEMPLATE_OFFLINE = """The AI assistant is temporarily unavailable, so I can't give a detailed answer right now. In the meantime you can try these safe steps:
+
+• Restart the program you're having trouble with
+• Restart your computer
+• Check that your network cable or Wi-Fi is connected
+
+If the problem continues, please click "Generate IT Ticket" and our IT team will help you."""
+
+# Rule-based answers
+# Clear escalations are answered instantly from the templates above instead of
+# asking the AI model. Messages that match an escalation trigger but also a safe
+# troubleshooting keyword are ambiguous and still go to the model.
+RULE_SETTINGS = {
+    "enabled": True,                # Answer clear escalations without the AI model
+    "open_ticket_dialog": False,    # Also open the "Generate IT Ticket" window
+}
+
 # ============================================================================
 # MODEL BEHAVIOR FINE-TUNING
 # ============================================================================
@@ -281,14 +553,25 @@ LANGUAGE_SETTINGS = {
 # ============================================================================
 
 # Debug settings
+# Logs everything (DEBUG level, including assembled prompts) and also prints
+# events to the console
 DEBUG_MODE = False
 
 # Log level
 LOG_LEVEL = "INFO"  # DEBUG, INFO, WARNING, ERROR
 
 # Enable response logging
+# True: questions and answers are written to the event log in full
+# False: only their length is logged
 LOG_RESPONSES = True
 
+# Event log file (JSON lines, see event_log.py)
+# When the file reaches LOG_MAX_BYTES it is compressed to a .gz file next to
+# it; only the newest LOG_BACKUP_COUNT compressed files are kept.
+LOG_FILE = "askforhelp_events.jsonl"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
 # ============================================================================
 # ADVANCED SETTINGS
 # ============================================================================
@@ -298,28 +581,66 @@ CONTEXT_SETTINGS = {
     "max_history_messages": 10,         # Number of previous messages to remember
     "summarize_old_messages": True,     # Summarize old messages to save tokens
     "forget_after_hours": 24,           # Forget conversation after hours
+    "max_context_tokens": 1024,         # Token budget for previous messages in the prompt
 }
 
 # Performance settings
 PERFORMANCE_SETTINGS = {
     "cache_responses": False,           # Cache common responses (not recommended for dynamic content)
-    "preload_models": False,            # Preload models on startup
+    "cache_file": "askforhelp_cache.db",  # SQLite file holding cached responses
+    "cache_ttl_hours": 168,             # Cached responses expire after this many hours
+    "cache_max_entries": 5000,          # Least recently used responses are removed above this
+    "semantic_cache": False,            # Also reuse answers to similarly worded questions (needs NumPy)
+    "semantic_cache_embedder": "ollama",  # "ollama" (embedding model) or "hashing" (no model, less accurate)
+    "embedding_model": "nomic-embed-text",  # Ollama model used to compare questions
+    "semantic_cache_threshold": 0.92,   # Similarity (0-1) needed to reuse an answer
+    "semantic_cache_max_entries": 20000,  # Questions kept in memory (oldest replaced first)
+    "preload_models": True,             # Preload models on startup
+    "keep_warm_minutes": 10,            # Ping the model this often so Ollama keeps it loaded (0 = off)
     "async_processing": True,           # Process requests asynchronously
+    "metrics_max_requests": 1000,       # Requests kept for the admin metrics view (Ctrl+Shift+M)
 }
 
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
-def get_model_parameters():
-    """Get all model parameters as a dictionary"""
-    return {
+def get_model_parameters(preset_name=None):
+    """Get all model parameters as a dictionary (optionally overridden by a preset)"""
+    parameters = {
         "temperature": TEMPERATURE,
         "top_p": TOP_P,
         "max_tokens": MAX_TOKENS,
         "frequency_penalty": FREQUENCY_PENALTY,
         "presence_penalty": PRESENCE_PENALTY,
+        "repeat_penalty": REPEAT_PENALTY,
     }
+    
+    # A preset chosen for this request wins over the preset applied with apply_preset()
+    preset = PRESETS.get(preset_name or ACTIVE_PRESET)
+    if preset:
+        for key in parameters:
+            if key in preset:
+                parameters[key] = preset[key]
+    return parameters
+
+def get_ollama_options(preset_name=None):
+    """Get the model parameters under the option names Ollama understands"""
+    parameters = get_model_parameters(preset_name)
+    return {OLLAMA_OPTION_NAMES[key]: value for key, value in parameters.items()}
+
+def get_output_token_limit(options):
+    """Number of tokens after which the client stops reading an answer"""
+    num_predict = options.get("num_predict")
+    if not num_predict or num_predict < 0:
+        return None
+    return int(num_predict * MAX_TOKENS_GUARD)
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in a piece of text (about 4 characters per token)"""
+    if not text:
+        return 0
+    return max(1, (len(text) + 3) // 4)
 
 def get_response_style():
     """Get response style configuration"""
@@ -347,6 +668,7 @@ def get_template(template_name, **kwargs):
         "safe_troubleshooting": TEMPLATE_SAFE_TROUBLESHOOTING,
         "clarification": TEMPLATE_CLARIFICATION,
         "urgent": TEMPLATE_URGENT,
+        "offline": TEMPLATE_OFFLINE,
     }
     
     template = templates.get(template_name, "")
@@ -354,38 +676,69 @@ def get_template(template_name, **kwargs):
         return template.format(**kwargs)
     return template
 
+def match_keywords(user_message):
+    """Find all escalation and troubleshooting keywords in a message
+    
+    Returns a list of (category, term) pairs, where category is
+    "always_escalate", "escalation_trigger", "admin_required" or
+    "safe_troubleshooting".
+    """
+    return KEYWORD_MATCHER.find_all(user_message)
+
+def get_escalation_match(user_message, matches=None):
+    """Get the (category, term) that makes a message an escalation, or None"""
+    if matches is None:
+        matches = match_keywords(user_message)
+    for category in ("always_escalate", "admin_required", "escalation_trigger"):
+        terms = [term for matched_category, term in matches if matched_category == category]
+        if terms:
+            return category, max(terms, key=len)
+    return None
+
 def should_escalate(user_message):
     """Determine if a message should be escalated to IT ticket"""
-    message_lower = user_message.lower()
+    return get_escalation_match(user_message) is not None
+
+def classify_message(user_message):
+    """Decide whether a message can be answered from a template without the AI model
+    
+    Returns (template_name, matched_term) for clear escalations,
+    or (None, None) when the model should answer.
+    """
+    matches = match_keywords(user_message)
+    categories = {category for category, _ in matches}
+    escalation = get_escalation_match(user_message, matches)
     
-    # Check for always escalate topics
-    for topic in ALWAYS_ESCALATE:
-        if topic in message_lower:
-            return True
+    # Always escalate topics are urgent, no matter what else the message says
+    if escalation and escalation[0] == "always_escalate":
+        return "urgent", escalation[1]
     
-    # Check for escalation triggers
-    for trigger in ESCALATION_TRIGGERS:
-        if trigger in message_lower:
-            return True
+    # Only unambiguous admin tasks are clear, and only when the user isn't
+    # also describing something safe to try; generic triggers go to the model
+    if escalation and escalation[0] == "admin_required" and "safe_troubleshooting" not in categories:
+        return "admin_required", escalation[1]
     
-    return False
+    return None, None
+
+def get_rule_response(user_message):
+    """Get an instant templated answer for a clear escalation, or None"""
+    template_name, term = classify_message(user_message)
+    if template_name == "urgent":
+        return get_template("urgent")
+    if template_name == "admin_required":
+        return get_template("admin_required", issue=ADMIN_REQUIRED_TASKS[term])
+    return None
 
 def is_safe_troubleshooting(user_message):
     """Determine if a message is safe for troubleshooting"""
-    message_lower = user_message.lower()
-    
-    for safe_keyword in SAFE_TROUBLESHOOTING:
-        if safe_keyword in message_lower:
-            return True
-    
-    return False
+    return any(category == "safe_troubleshooting" for category, _ in match_keywords(user_message))
 
 # ============================================================================
 # CONFIGURATION VALIDATION
 # ============================================================================
 
 def validate_configuration():
-    """Validate the configuration settings"""
+    """Validate the configuration settings; returns a list of errors (empty if valid)"""
     errors = []
     
     # Validate temperature
@@ -400,6 +753,26 @@ def validate_configuration():
     if MAX_TOKENS < 1:
         errors.append("Max tokens must be positive")
     
+    if MAX_TOKENS_GUARD < 1.0:
+        errors.append("Max tokens guard must be at least 1.0")
+    
+    # Validate repeat penalty
+    if REPEAT_PENALTY <= 0.0:
+        errors.append("Repeat penalty must be positive")
+    
+    # Validate presets
+    for name, preset in PRESETS.items():
+        if preset.get("max_tokens", 1) < 1:
+            errors.append(f"Preset '{name}' max_tokens must be positive")
+    if ACTIVE_PRESET is not None and ACTIVE_PRESET not in PRESETS:
+        errors.append(f"Active preset '{ACTIVE_PRESET}' not found")
+    
+    # Validate logging
+    if LOG_LEVEL not in ("DEBUG", "INFO", "WARNING", "ERROR"):
+        errors.append("Log level must be one of: DEBUG, INFO, WARNING, ERROR")
+    if LOG_MAX_BYTES < 1024:
+        errors.append("Log max bytes must be at least 1024")
+    
     # Validate response length
     valid_lengths = ["concise", "standard", "detailed"]
     if RESPONSE_LENGTH not in valid_lengths:
@@ -411,13 +784,7 @@ def validate_configuration():
         if tone not in TONE_SETTINGS:
             errors.append(f"Tone setting '{tone}' is missing")
     
-    if errors:
-        print("Configuration validation errors:")
-        for error in errors:
-            print(f"  - {error}")
-        return False
-    
-    return True
+    return errors
 
 # ============================================================================
 # CONFIGURATION PRESETS
@@ -455,21 +822,57 @@ PRESETS = {
     },
 }
 
+# Preset used for every request that doesn't pick its own (None = use the values above)
+# Set it here to change the preset of the running chatbot (applied by hot reload)
+ACTIVE_PRESET = None
+
+# Ollama option name for each model parameter
+OLLAMA_OPTION_NAMES = {
+    "temperature": "temperature",
+    "top_p": "top_p",
+    "max_tokens": "num_predict",
+    "frequency_penalty": "frequency_penalty",
+    "presence_penalty": "presence_penalty",
+    "repeat_penalty": "repeat_penalty",
+}
+
 def apply_preset(preset_name):
-    """Apply a preset configuration"""
+    """Apply a preset to this module object (None resets to the defaults)
+    
+    Only affects code using this module directly (scripts, tests). The running
+    chatbot reads a settings snapshot loaded from this file, so set
+    ACTIVE_PRESET above instead; hot reload applies it to following requests.
+    """
+    global ACTIVE_PRESET, RESPONSE_LENGTH
+    
+    if preset_name is None:
+        ACTIVE_PRESET = None
+        log_event("INFO", "preset_applied", preset=None)
+        return True
+    
     if preset_name not in PRESETS:
-        print(f"Preset '{preset_name}' not found. Available presets: {list(PRESETS.keys())}")
+        log_event("WARNING", "preset_not_found", preset=preset_name, available=list(PRESETS.keys()))
         return False
     
     preset = PRESETS[preset_name]
+    ACTIVE_PRESET = preset_name
+    if "response_length" in preset:
+        RESPONSE_LENGTH = preset["response_length"]
     
-    # Update global variables (note: this is a simplified approach)
-    print(f"Applying preset: {preset_name}")
-    for key, value in preset.items():
-        print(f"  {key}: {value}")
-    
+    log_event("INFO", "preset_applied", preset=preset_name, settings=preset)
     return True
 
+# Prompt templates compiled once at import
+PROMPT_BUILDER = PromptBuilder(get_prompt_templates())
+
+# Keyword lists compiled once at import
+KEYWORD_MATCHER = KeywordMatcher({
+    "always_escalate": ALWAYS_ESCALATE,
+    "escalation_trigger": ESCALATION_TRIGGERS,
+    "admin_required": list(ADMIN_REQUIRED_TASKS),
+    "safe_troubleshooting": SAFE_TROUBLESHOOTING,
+})
+
 # ============================================================================
 # INITIALIZATION
 # ============================================================================
@@ -477,11 +880,18 @@ def apply_preset(preset_name):
 # Validate configuration on import
 if __name__ == "__main__":
     print("Validating model behavior configuration...")
-    if validate_configuration():
+    errors = validate_configuration()
+    if not errors:
         print("✓ Configuration is valid")
     else:
-        print("✗ Configuration has errors")
+        print("✗ Configuration has errors:")
+        for error in errors:
+            print(f"  - {error}")
     
     print("\nAvailable presets:")
     for preset_name in PRESETS.keys():
         print(f"  - {preset_name}")
+    
+    print("\nPrompt templates (estimated tokens):")
+    for name, info in PROMPT_BUILDER.get_token_report().items():
+        print(f"  - {name}: {info['shared_prefix_tokens']} shared prefix, fields: {', '.join(info['fields'])}")
@@ -20,14 +20,131 @@ Admin can change the model here without modifying the main application code.
 # To use a different model:
 # 1. Make sure the model is downloaded: ollama pull <model_name>
 # 2. Update the MODEL_NAME variable below
-# 3. Restart the application
+# 3. Save the file (the application picks up the change within a few seconds)
 
 # MODEL_NAME = "qwen3:4b"
 MODEL_NAME = "phi:2.7b"
 
+# Adaptive Model Routing
+# When enabled, each question is sent to a model sized for it (chosen from the
+# models installed in Ollama): short and basic troubleshooting questions go to
+# the smallest model, long or "why/explain" questions and long conversations go
+# to the largest model (up to max_model_size billion parameters), and everything
+# else uses MODEL_NAME. See model_router.py.
+MODEL_ROUTING = {
+    "enabled": False,
+    "simple_max_words": 12,         # Questions this short count as simple
+    "complex_min_words": 60,        # Questions this long count as complex
+    "deep_conversation_turns": 6,   # Conversations this long count as complex
+    "max_model_size": 13,           # Largest model to use, in billions of parameters
+    "complex_keywords": ["why", "explain", "compare", "difference", "intermittent",
+                         "randomly", "sometimes", "multiple", "several"],
+}
+
 # Ollama API Configuration
 OLLAMA_URL = "http://localhost:11434/api/generate"
 
+# Multiple Ollama Servers (optional)
+# List several servers to share the load between them, e.g.
+#   OLLAMA_URLS = ["http://10.0.0.11:11434", "http://10.0.0.12:11434"]
+# Each question goes to the healthy server with the fewest requests in flight.
+# A server that fails BACKEND_FAILURE_THRESHOLD times in a row is skipped until
+# a health check (every HEALTH_CHECK_INTERVAL seconds) succeeds again.
+# Leave empty to use OLLAMA_URL only.
+OLLAMA_URLS = []
+HEALTH_CHECK_INTERVAL = 30
+BACKEND_FAILURE_THRESHOLD = 3
+
+# Circuit Breaker
+# After failure_threshold connection errors or timeouts in a row (or when every
+# server fails its health checks), questions stop waiting for the AI server and
+# are answered at once from the rule templates and cached answers. The server
+# is checked again every retry_seconds; the AI model is used again as soon as
+# it responds.
+CIRCUIT_BREAKER = {
+    "enabled": True,
+    "failure_threshold": 3,
+    "retry_seconds": 10,
+}
+
+# API Mode
+# - "chat": uses /api/chat with a fixed system message followed by the
+#   conversation. Because the system message is identical on every question,
+#   Ollama can reuse its cached evaluation of it instead of re-reading the
+#   whole prompt each time (much faster on CPU).
+# - "generate": uses /api/generate with one formatted prompt per question
+API_MODE = "chat"
+
+# How long Ollama keeps the model (and its prompt cache) loaded after a request
+KEEP_ALIVE = "30m"
+
+# Request Scheduling
+# Maximum number of requests this application sends to Ollama at the same time.
+# Further requests wait in a queue; urgent issues (see ALWAYS_ESCALATE and
+# ESCALATION_TRIGGERS in model_behavior_config.py) are served before others.
+MAX_CONCURRENT_REQUESTS = 2
+
+# Hedged Requests
+# If the first token of an answer hasn't arrived after first_token_deadline
+# seconds, the same question is also sent to a second server (when several are
+# listed in OLLAMA_URLS) or to a lighter model. The first one to start answering
+# is used and the other request is cancelled.
+# Set first_token_deadline to roughly your 95th percentile time-to-first-token.
+HEDGING = {
+    "enabled": False,
+    "first_token_deadline": 8.0,   # Seconds to wait before sending the backup request
+    "fallback_model": None,        # Lighter model for the backup (None = smallest installed model)
+}
+
+# HTTP Connection Settings
+# All Ollama calls share one pooled, keep-alive connection to the server
+CONNECT_TIMEOUT = 5      # Seconds to wait for the TCP connection to Ollama
+READ_TIMEOUT = 60        # Seconds to wait for data once connected
+HTTP_POOL_SIZE = 4       # Maximum pooled connections kept open to the server
+
+# CPU Inference Tuning
+# Ollama options for CPU-only servers (see cpu_tuning.py):
+# - num_thread: threads used for inference (auto: number of physical cores)
+# - num_ctx: context window in tokens (auto: smallest size that fits our prompts
+#   plus the longest answer, which saves memory and prompt processing time)
+# - num_batch: prompt tokens processed per step (auto: 512, 256 below 8 GB RAM)
+# Auto-tuning uses this machine's hardware, so it only runs when Ollama is on
+# localhost (set "tune_remote" to True to use it for a remote server anyway).
+# Set a value to override it; None = auto. "enabled": False sends none of
+# these options and leaves Ollama's defaults in place.
+# Measure the effect with: python benchmarks/bench_cpu_tuning.py
+CPU_TUNING = {
+    "enabled": True,
+    "num_thread": None,
+    "num_ctx": None,
+    "num_batch": None,
+    "tune_remote": False,
+}
+
+# Streaming Configuration
+# When enabled, answers appear word-by-word while the model is still generating,
+# instead of only after the whole response is finished.
+# (Responses are always streamed from Ollama so the Stop button can abort them;
+# this setting only controls how they are displayed.)
+STREAM_RESPONSES = True
+
+# How often (in milliseconds) streamed text is drawn into the chat window.
+# Tokens arriving between updates are batched into a single insert.
+STREAM_UPDATE_INTERVAL_MS = 50
+
+# Hot Reload
+# Changes to this file and model_behavior_config.py are picked up while the
+# application is running (checked every check_interval seconds). Invalid
+# changes are rejected and the previous settings stay in use. Server,
+# connection, scheduler, CPU tuning, cache and log file settings still need
+# a restart (the status bar says which).
+# In AskForHelp.exe, place copies of both files next to the executable and
+# edit those (see INSTALLATION_GUIDE.md).
+HOT_RELOAD = {
+    "enabled": True,
+    "check_interval": 2.0,
+}
+
 # Model Options (advanced settings)
 MODEL_OPTIONS = {
     "temperature": 0.7,  # Controls randomness (0.0-1.0, lower = more focused)
@@ -38,5 +155,31 @@ MODEL_OPTIONS = {
 # Notes:
 # - The model name is NOT displayed to end users
 # - Only administrators should modify this file
-# - Changes take effect after restarting the application
+# - Most changes take effect within a few seconds (see HOT_RELOAD above)
 # - For LAN deployment, update OLLAMA_URL to point to your server
+
+
+def validate_configuration():
+    """Validate the configuration settings; returns a list of errors (empty if valid)"""
+    errors = []
+    
+    if not MODEL_NAME:
+        errors.append("MODEL_NAME must not be empty")
+    
+    for url in [OLLAMA_URL] + list(OLLAMA_URLS):
+        if not url.startswith(("http://", "https://")):
+            errors.append(f"Invalid Ollama URL: {url}")
+    
+    if API_MODE not in ("chat", "generate"):
+        errors.append("API_MODE must be \"chat\" or \"generate\"")
+    
+    if MAX_CONCURRENT_REQUESTS < 1:
+        errors.append("MAX_CONCURRENT_REQUESTS must be at least 1")
+    
+    if STREAM_UPDATE_INTERVAL_MS < 1:
+        errors.append("STREAM_UPDATE_INTERVAL_MS must be positive")
+    
+    if HEDGING.get("enabled") and HEDGING.get("first_token_deadline", 0) <= 0:
+        errors.append("HEDGING first_token_deadline must be positive")
+    
+    return errors
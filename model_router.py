@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Model Router for AskForHelp Chatbot
+
+Sends each question to a model sized for it, so most traffic runs on a fast
+small model and only hard questions pay for a large one. Questions are
+classified cheaply (length, keyword categories, conversation depth) into a
+tier, and each tier has a model size and a preset from PRESETS in
+model_behavior_config.py:
+
+- "urgent":   escalation topics -> small model, "urgent" preset
+- "simple":   short questions or basic troubleshooting -> small model, "precise" preset
+- "standard": everything else -> MODEL_NAME, "balanced" preset
+- "complex":  long or "why/explain" questions, deep conversations -> large model,
+              "educational" preset
+"""
+
+import re
+
+import model_behavior_config
+from ollama_client import get_model_size
+
+
+# Preset used for each tier (see PRESETS in model_behavior_config.py)
+TIER_PRESETS = {
+    "urgent": "urgent",
+    "simple": "precise",
+    "standard": "balanced",
+    "complex": "educational",
+}
+
+
+def is_chat_model(model_name):
+    """Embedding models can't answer questions"""
+    return "embed" not in model_name.lower()
+
+
+class ModelRouter:
+    """Chooses a model and preset for each question"""
+
+    def __init__(self, settings, behavior=None):
+        self.behavior = behavior or model_behavior_config
+        self.enabled = settings.get("enabled", False)
+        self.simple_max_words = settings.get("simple_max_words", 12)
+        self.complex_min_words = settings.get("complex_min_words", 60)
+        self.deep_conversation_turns = settings.get("deep_conversation_turns", 6)
+        self.max_model_size = settings.get("max_model_size", 13)
+        self.complex_pattern = re.compile(
+            r"\b(?:" + "|".join(re.escape(word) for word in settings.get("complex_keywords", [])) + r")\b"
+        ) if settings.get("complex_keywords") else None
+
+    def classify(self, user_message, conversation_turns=0):
+        """Put a question into a tier: "urgent", "simple", "standard" or "complex" """
+        matches = self.behavior.match_keywords(user_message)
+        if self.behavior.get_escalation_match(user_message, matches):
+            return "urgent"
+
+        word_count = len(user_message.split())
+        if (word_count >= self.complex_min_words
+                or conversation_turns >= self.deep_conversation_turns
+                or (self.complex_pattern and self.complex_pattern.search(user_message.lower()))):
+            return "complex"
+
+        is_safe = any(category == "safe_troubleshooting" for category, _ in matches)
+        if word_count <= self.simple_max_words or is_safe:
+            return "simple"
+
+        return "standard"
+
+    def choose_model(self, tier, available_models, default_model):
+        """Pick the model for a tier from the installed models"""
+        sized = []
+        for name in available_models:
+            size = get_model_size(name)
+            if size is not None and size <= self.max_model_size and is_chat_model(name):
+                sized.append((size, name))
+
+        if tier == "standard" or not sized:
+            return default_model
+
+        if tier in ("simple", "urgent"):
+            return min(sized)[1]
+        return max(sized)[1]
+
+    def route(self, user_message, conversation_turns, available_models, default_model):
+        """Get the tier, model and preset for a question"""
+        if not self.enabled:
+            return {"tier": None, "model": default_model, "preset": None}
+
+        tier = self.classify(user_message, conversation_turns)
+        return {
+            "tier": tier,
+            "model": self.choose_model(tier, available_models, default_model),
+            "preset": TIER_PRESETS[tier],
+        }
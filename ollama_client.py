@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ollama API Client for AskForHelp Chatbot
+
+A single, session-backed HTTP client shared by every Ollama call.
+Connections are pooled and kept alive, so repeated questions reuse the same
+TCP connection instead of opening a new one each time (this matters when
+OLLAMA_URL points at a server on the LAN).
+
+BackendPool spreads requests over several Ollama servers (OLLAMA_URLS).
+CircuitBreaker makes requests fail at once while the servers are known to
+be down, instead of each one waiting for a connection error or timeout.
+"""
+
+import json
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+import model_config
+from event_log import log_event
+
+
+def get_chunk_text(chunk):
+    """Get the generated text from a /api/generate or /api/chat response (or stream chunk)"""
+    if 'message' in chunk:
+        return chunk['message'].get('content', '')
+    return chunk.get('response', '')
+
+
+def iter_chunks(response):
+    """Parse Ollama's NDJSON stream into chunk dictionaries (closes the response at the end)"""
+    try:
+        for line in response.iter_lines():
+            if not line:
+                continue
+
+            chunk = json.loads(line)
+            if chunk.get('error'):
+                raise OllamaAPIError(chunk['error'])
+            yield chunk
+
+            if chunk.get('done'):
+                return
+    finally:
+        response.close()
+
+
+# RequestHandle of the request being sent on each thread, so the connection
+# carrying it can be registered for cancelling
+sending = threading.local()
+
+
+class CancellableConnectionMixin:
+    """Registers the connection with the RequestHandle of the request it sends
+
+    Until Ollama sends the response headers (while it loads the model and
+    evaluates the prompt) there is no response to close; cancelling shuts
+    down this connection's socket instead.
+    """
+
+    def connect(self):
+        super().connect()
+        handle = getattr(sending, "handle", None)
+        if handle is not None and handle.is_cancelled():
+            self.close()
+            raise RequestCancelled()
+
+    def request(self, *args, **kwargs):
+        handle = getattr(sending, "handle", None)
+        if handle is not None:
+            handle.attach_connection(self)
+        return super().request(*args, **kwargs)
+
+
+class CancellableHTTPConnection(CancellableConnectionMixin, HTTPConnection):
+    pass
+
+
+class CancellableHTTPSConnection(CancellableConnectionMixin, HTTPSConnection):
+    pass
+
+
+class CancellableHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = CancellableHTTPConnection
+
+
+class CancellableHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = CancellableHTTPSConnection
+
+
+class CancellableAdapter(HTTPAdapter):
+    """HTTPAdapter whose connections can be aborted by a RequestHandle"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CancellableHTTPConnectionPool,
+            "https": CancellableHTTPSConnectionPool,
+        }
+
+
+def get_model_size(model_name):
+    """Parameter count in billions from a model tag such as "phi:2.7b" (None if unknown)"""
+    match = re.search(r"(\d+(?:\.\d+)?)b\b", model_name.lower())
+    return float(match.group(1)) if match else None
+
+
+def get_base_url(url):
+    """Reduce an Ollama URL such as http://host:11434/api/generate to http://host:11434"""
+    parts = urlsplit(url)
+    if not parts.scheme or not parts.netloc:
+        raise ValueError(f"Invalid Ollama URL: {url}")
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+class OllamaClient:
+    """Pooled, keep-alive HTTP client for the Ollama REST API"""
+
+    def __init__(self, url=None, connect_timeout=None, read_timeout=None, pool_size=None):
+        self.base_url = get_base_url(url or model_config.OLLAMA_URL)
+        self.connect_timeout = connect_timeout or model_config.CONNECT_TIMEOUT
+        self.read_timeout = read_timeout or model_config.READ_TIMEOUT
+        pool_size = pool_size or model_config.HTTP_POOL_SIZE
+
+        # One session for the whole application: connections are reused
+        # between requests (HTTP keep-alive) and pooled between threads
+        self.session = requests.Session()
+        adapter = CancellableAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Connection': 'keep-alive',
+        })
+
+    def url(self, path):
+        """Build the full URL for an API path"""
+        return self.base_url + path
+
+    def timeout(self, read_timeout=None):
+        """Get the (connect, read) timeout tuple used by requests"""
+        return (self.connect_timeout, read_timeout or self.read_timeout)
+
+    def get(self, path, read_timeout=None):
+        """Send a GET request to the Ollama API"""
+        return self.session.get(self.url(path), timeout=self.timeout(read_timeout))
+
+    def post(self, path, payload, stream=False, read_timeout=None, handle=None):
+        """Send a POST request with a JSON body to the Ollama API
+
+        With a RequestHandle, cancelling it also aborts a request that is
+        still waiting for the response headers.
+        """
+        sending.handle = handle
+        try:
+            return self.session.post(
+                self.url(path),
+                json=payload,
+                timeout=self.timeout(read_timeout),
+                stream=stream
+            )
+        finally:
+            sending.handle = None
+
+    def generate(self, payload, stream=False, handle=None):
+        """Call /api/generate"""
+        return self.post('/api/generate', payload, stream=stream, handle=handle)
+
+    def chat(self, payload, stream=False, handle=None):
+        """Call /api/chat"""
+        return self.post('/api/chat', payload, stream=stream, handle=handle)
+
+    def load_model(self, model, keep_alive=None, options=None):
+        """Load a model into memory (or refresh its keep-alive timer) without generating
+
+        Pass the same load options (num_ctx etc.) as the requests will use,
+        otherwise Ollama loads the model again on the first request.
+        """
+        payload = {"model": model}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        if options:
+            payload["options"] = options
+        return self.post('/api/generate', payload)
+
+    def embed(self, payload):
+        """Call /api/embed"""
+        return self.post('/api/embed', payload)
+
+    def tags(self, read_timeout=None):
+        """Call /api/tags (list locally available models)"""
+        return self.get('/api/tags', read_timeout=read_timeout)
+
+    def close(self):
+        """Close all pooled connections"""
+        self.session.close()
+
+
+class Backend:
+    """One Ollama server in a BackendPool"""
+
+    def __init__(self, url):
+        self.client = OllamaClient(url)
+        self.url = self.client.base_url
+        self.outstanding = 0
+        self.failures = 0
+        self.healthy = True
+        self.last_error = None
+
+
+class CircuitBreaker:
+    """Fails requests fast while Ollama is unreachable
+
+    - closed: requests go through; failure_threshold connection errors or
+      timeouts in a row open the circuit
+    - open: requests fail at once with CircuitOpenError
+    - half-open: after retry_seconds one trial request is let through;
+      success closes the circuit, failure opens it again, and a trial that
+      ends without either (cancelled) lets the next request try
+
+    A successful background health probe also closes the circuit.
+    """
+
+    def __init__(self, failure_threshold=3, retry_seconds=10, on_change=None):
+        self.failure_threshold = failure_threshold
+        self.retry_seconds = retry_seconds
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.last_error = None
+        self.trial_running = False
+
+    def allow(self):
+        """Check whether a request may be sent now
+
+        Returns "trial" for the trial request of the half-open state, which
+        must end with record_success(), record_failure() or release_trial().
+        """
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.retry_seconds:
+                self.set_state("half-open")
+            if self.state == "half-open" and not self.trial_running:
+                self.trial_running = True
+                return "trial"
+            return False
+
+    def release_trial(self):
+        """The trial request ended without showing whether the server is reachable"""
+        with self.lock:
+            self.trial_running = False
+
+    def record_success(self):
+        """A request or probe reached the server"""
+        with self.lock:
+            self.trial_running = False
+            self.failures = 0
+            self.last_error = None
+            if self.state != "closed":
+                self.set_state("closed")
+
+    def record_failure(self, error):
+        """A request or probe could not reach the server"""
+        with self.lock:
+            self.trial_running = False
+            self.failures += 1
+            self.last_error = str(error)
+            if self.state == "half-open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+                self.set_state("open")
+
+    def trip(self, error):
+        """Open the circuit now (e.g. when every server failed its health checks)"""
+        with self.lock:
+            self.trial_running = False
+            self.last_error = str(error)
+            self.opened_at = time.monotonic()
+            if self.state != "open":
+                self.set_state("open")
+
+    def trial_in_progress(self):
+        """Check whether the half-open trial request is still running"""
+        with self.lock:
+            return self.state == "half-open" and self.trial_running
+
+    def is_open(self):
+        """Check whether requests are currently being failed fast"""
+        return self.state != "closed"
+
+    def retry_in(self):
+        """Seconds until the next trial request is allowed"""
+        with self.lock:
+            if self.state != "open":
+                return 0.0
+            return max(0.0, self.retry_seconds - (time.monotonic() - self.opened_at))
+
+    def set_state(self, state):
+        """Change state and notify the listener (lock held)"""
+        self.state = state
+        log_event("WARNING" if state == "open" else "INFO", "circuit_breaker", state=state,
+                  error=self.last_error if state == "open" else None)
+        if self.on_change:
+            self.on_change(state)
+
+
+class BackendPool:
+    """Routes Ollama calls across several servers
+
+    Each request goes to the healthy server with the fewest requests in
+    flight. A server is ejected after failure_threshold consecutive failures
+    and re-admitted as soon as a background health probe (/api/tags) succeeds.
+    """
+
+    def __init__(self, urls, probe_interval=30, failure_threshold=3, breaker=None):
+        if not urls:
+            raise ValueError("At least one Ollama URL is required")
+        self.backends = [Backend(url) for url in urls]
+        self.probe_interval = probe_interval
+        self.failure_threshold = failure_threshold
+        self.breaker = breaker
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.probe_thread = None
+
+    @property
+    def base_url(self):
+        """Server address(es), for messages"""
+        return ", ".join(backend.url for backend in self.backends)
+
+    def pick(self, exclude=()):
+        """Choose the healthy backend with the fewest outstanding requests"""
+        with self.lock:
+            candidates = [b for b in self.backends if b.healthy and b not in exclude]
+            if not candidates:
+                # Nothing healthy: fall back to the server with the fewest failures
+                candidates = [b for b in self.backends if b not in exclude] or self.backends
+            backend = min(candidates, key=lambda b: (b.outstanding, b.failures))
+            backend.outstanding += 1
+            return backend
+
+    def get_backend(self, client):
+        """The backend a client handed out by acquire() belongs to"""
+        return next(backend for backend in self.backends if backend.client is client)
+
+    def finish(self, backend, error=None):
+        """Record the end of a request on a backend"""
+        with self.lock:
+            backend.outstanding -= 1
+            if error is None:
+                backend.failures = 0
+                backend.healthy = True
+                return
+
+            self.record_failure(backend, error)
+
+    def record_failure(self, backend, error):
+        """Count a failure and eject the backend after too many (lock held)"""
+        backend.failures += 1
+        backend.last_error = str(error)
+        if backend.failures >= self.failure_threshold and backend.healthy:
+            backend.healthy = False
+            log_event("WARNING", "backend_ejected", url=backend.url, error=str(error))
+
+    @contextmanager
+    def acquire(self, exclude=()):
+        """Hold a backend for the duration of a request (e.g. while reading a stream)
+
+        Raises CircuitOpenError at once while the circuit breaker is open.
+        The circuit breaker learns the outcome on every exit: connection
+        errors and timeouts are failures; an error response from Ollama or a
+        stream closed early (Stop, output guard, lost hedge race) shows that
+        the server is reachable; anything else (e.g. cancelled before an
+        answer) lets the next request be the half-open trial.
+        """
+        permit = True
+        if self.breaker is not None:
+            permit = self.breaker.allow()
+            if not permit:
+                raise CircuitOpenError(f"Ollama is unreachable ({self.breaker.last_error})")
+
+        backend = self.pick(exclude)
+        try:
+            yield backend.client
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            self.finish(backend, e)
+            if self.breaker is not None:
+                self.breaker.record_failure(e)
+            raise
+        except (OllamaAPIError, GeneratorExit):
+            self.finish(backend)
+            if self.breaker is not None:
+                self.breaker.record_success()
+            raise
+        except BaseException:
+            self.finish(backend)
+            if permit == "trial":
+                self.breaker.release_trial()
+            raise
+        else:
+            self.finish(backend)
+            if self.breaker is not None:
+                self.breaker.record_success()
+
+    def generate(self, payload, stream=False):
+        """Call /api/generate on the least busy server (non-streaming use)"""
+        with self.acquire() as client:
+            return client.generate(payload, stream=stream)
+
+    def chat(self, payload, stream=False):
+        """Call /api/chat on the least busy server (non-streaming use)"""
+        with self.acquire() as client:
+            return client.chat(payload, stream=stream)
+
+    def embed(self, payload):
+        """Call /api/embed on the least busy server"""
+        with self.acquire() as client:
+            return client.embed(payload)
+
+    def tags(self, read_timeout=None):
+        """Call /api/tags on the least busy server"""
+        with self.acquire() as client:
+            return client.tags(read_timeout=read_timeout)
+
+    def load_model(self, model, keep_alive=None, options=None):
+        """Load a model on the least busy server"""
+        with self.acquire() as client:
+            return client.load_model(model, keep_alive=keep_alive, options=options)
+
+    def healthy_count(self):
+        """Number of servers currently accepting requests"""
+        with self.lock:
+            return sum(1 for backend in self.backends if backend.healthy)
+
+    def status(self):
+        """Health and load of every server"""
+        with self.lock:
+            return [{
+                "url": backend.url,
+                "healthy": backend.healthy,
+                "outstanding": backend.outstanding,
+                "failures": backend.failures,
+                "last_error": backend.last_error,
+            } for backend in self.backends]
+
+    def probe(self, backend):
+        """Check one server with /api/tags and eject or re-admit it"""
+        try:
+            response = backend.client.tags(read_timeout=backend.client.connect_timeout)
+            response.raise_for_status()
+        except Exception as e:
+            with self.lock:
+                self.record_failure(backend, e)
+                all_down = not any(b.healthy for b in self.backends)
+            # Every server ejected: Ollama is known to be down
+            if self.breaker is not None and all_down:
+                self.breaker.trip(e)
+            return False
+
+        with self.lock:
+            if not backend.healthy:
+                log_event("INFO", "backend_readmitted", url=backend.url)
+            backend.healthy = True
+            backend.failures = 0
+            backend.last_error = None
+        if self.breaker is not None:
+            self.breaker.record_success()
+        return True
+
+    def start_health_checks(self):
+        """Probe all servers periodically on a background thread"""
+        if self.probe_thread is not None or self.probe_interval <= 0:
+            return
+
+        def run():
+            while not self.stop_event.wait(self.get_probe_interval()):
+                for backend in self.backends:
+                    self.probe(backend)
+
+        self.probe_thread = threading.Thread(target=run)
+        self.probe_thread.daemon = True
+        self.probe_thread.start()
+
+    def get_probe_interval(self):
+        """Seconds until the next health check (sooner while the circuit is open)"""
+        if self.breaker is not None and self.breaker.is_open():
+            return min(self.probe_interval, self.breaker.retry_seconds)
+        return self.probe_interval
+
+    def close(self):
+        """Stop health checks and close all connections"""
+        self.stop_event.set()
+        for backend in self.backends:
+            backend.client.close()
+
+
+class OllamaAPIError(Exception):
+    """Ollama returned an error status or an error in the response stream"""
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while Ollama is known to be unreachable"""
+
+
+class RequestCancelled(Exception):
+    """Raised in the worker thread when its request was stopped by the user"""
+
+
+class RequestHandle:
+    """Lets another thread cancel an in-flight Ollama request
+
+    Cancelling closes the HTTP connection, also while the request is still
+    waiting for the response headers. Ollama notices the disconnect and
+    stops generating, which frees the server slot for other users.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cancelled = False
+        self.response = None
+        self.connection = None
+
+    def attach_connection(self, connection):
+        """Register the connection sending the request (before the response arrives)"""
+        with self.lock:
+            if self.cancelled:
+                raise RequestCancelled()
+            self.connection = connection
+
+    def attach(self, response):
+        """Register the response being read (closed at once if already cancelled)"""
+        with self.lock:
+            self.response = response
+            self.connection = None
+            if self.cancelled:
+                response.close()
+                raise RequestCancelled()
+
+    def cancel(self):
+        """Cancel the request and close its connection"""
+        with self.lock:
+            self.cancelled = True
+            if self.response is not None:
+                self.response.close()
+            elif self.connection is not None:
+                # Still waiting for the headers: unblock the sending thread
+                sock = getattr(self.connection, "sock", None)
+                if sock is not None:
+                    try:
+                        sock.shutdown(socket.SHUT_RDWR)
+                    except OSError:
+                        pass
+
+    def is_cancelled(self):
+        """Check whether the request was cancelled"""
+        return self.cancelled
+
+    def close(self):
+        """Release the response once the request is finished"""
+        with self.lock:
+            self.connection = None
+            if self.response is not None:
+                self.response.close()
+                self.response = None
+
+
+class PromptEvalStats:
+    """Tracks Ollama's prompt evaluation time to measure prompt cache savings"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.first = None
+        self.last = None
+        self.count = 0
+        self.total_ms = 0.0
+
+    def record(self, result):
+        """Record the timing fields of a finished Ollama response"""
+        if 'prompt_eval_duration' not in result:
+            return
+
+        sample = {
+            "tokens": result.get('prompt_eval_count', 0),
+            "ms": result['prompt_eval_duration'] / 1e6,
+        }
+        with self.lock:
+            if self.first is None:
+                self.first = sample
+            self.last = sample
+            self.count += 1
+            self.total_ms += sample["ms"]
+
+    def summary(self):
+        """One-line summary comparing the latest prompt eval with the first one"""
+        with self.lock:
+            if self.last is None:
+                return "Prompt eval: no data"
+            average = self.total_ms / self.count
+            return (f"Prompt eval: {self.last['ms']:.0f} ms for {self.last['tokens']} tokens "
+                    f"(first question: {self.first['ms']:.0f} ms for {self.first['tokens']} tokens, "
+                    f"average: {average:.0f} ms over {self.count} requests)")
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Request Scheduler for AskForHelp Chatbot
+
+Limits how many requests this client sends to the Ollama server at the same
+time and decides which waiting request goes next:
+- "urgent": escalation topics (short answers, always go first)
+- "normal": regular questions
+- "educational": long, detailed answers
+- "background": model warm-up and keep-alive pings
+
+Requests of the same class are served first come, first served.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from ollama_client import RequestCancelled
+
+
+# Lower number = served first
+PRIORITIES = {
+    "urgent": 0,
+    "normal": 1,
+    "educational": 2,
+    "background": 3,
+}
+
+# How often a waiting request checks whether it was cancelled
+CANCEL_CHECK_SECONDS = 0.2
+
+
+class RequestScheduler:
+    """Concurrency limit with priority classes for Ollama requests"""
+
+    def __init__(self, max_concurrent=2, on_change=None):
+        self.max_concurrent = max_concurrent
+        self.on_change = on_change
+        self.condition = threading.Condition()
+        self.waiting = []
+        self.counter = itertools.count()
+        self.active = 0
+
+        # Wait time statistics per priority class
+        self.wait_totals = {name: 0.0 for name in PRIORITIES}
+        self.wait_counts = {name: 0 for name in PRIORITIES}
+        self.last_wait = 0.0
+
+    def acquire(self, priority="normal", handle=None):
+        """Wait for a free slot; returns the seconds spent waiting
+
+        Raises RequestCancelled if the handle is cancelled while the request is queued.
+        """
+        entry = (PRIORITIES[priority], next(self.counter))
+        started = time.perf_counter()
+
+        with self.condition:
+            heapq.heappush(self.waiting, entry)
+            self.notify_change()
+
+            try:
+                while self.active >= self.max_concurrent or self.waiting[0] != entry:
+                    if handle is not None and handle.is_cancelled():
+                        raise RequestCancelled()
+                    self.condition.wait(CANCEL_CHECK_SECONDS)
+            except BaseException:
+                self.waiting.remove(entry)
+                heapq.heapify(self.waiting)
+                self.condition.notify_all()
+                self.notify_change()
+                raise
+
+            heapq.heappop(self.waiting)
+            self.active += 1
+
+            waited = time.perf_counter() - started
+            self.wait_totals[priority] += waited
+            self.wait_counts[priority] += 1
+            self.last_wait = waited
+            self.notify_change()
+            return waited
+
+    def try_acquire(self, priority="background"):
+        """Take a slot only if one is free and no queued request would be served first
+
+        Returns True if a slot was taken (give it back with release()).
+        """
+        with self.condition:
+            if self.active >= self.max_concurrent:
+                return False
+            if any(entry[0] <= PRIORITIES[priority] for entry in self.waiting):
+                return False
+            self.active += 1
+            self.notify_change()
+            return True
+
+    def release(self):
+        """Give a slot back after the request finished"""
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+            self.notify_change()
+
+    def slot(self, priority="normal", handle=None):
+        """Context manager holding a slot for the duration of a request"""
+        return SchedulerSlot(self, priority, handle)
+
+    def position(self, priority):
+        """How many queued requests would be served before a new one of this class"""
+        with self.condition:
+            return sum(1 for entry in self.waiting if entry[0] <= PRIORITIES[priority])
+
+    def stats(self):
+        """Queue depth, active requests and wait times"""
+        with self.condition:
+            return self.get_stats_locked()
+
+    def get_stats_locked(self):
+        """stats() for callers already holding the lock"""
+        average_wait = {
+            name: round(self.wait_totals[name] / self.wait_counts[name], 3)
+            for name in PRIORITIES if self.wait_counts[name]
+        }
+        return {
+            "queued": len(self.waiting),
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "last_wait": round(self.last_wait, 3),
+            "average_wait": average_wait,
+        }
+
+    def notify_change(self):
+        """Report the current stats to the listener (called with the lock held)"""
+        if self.on_change:
+            self.on_change(self.get_stats_locked())
+
+
+class SchedulerSlot:
+    """Context manager returned by RequestScheduler.slot()"""
+
+    def __init__(self, scheduler, priority, handle):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.handle = handle
+        self.waited = 0.0
+
+    def __enter__(self):
+        self.waited = self.scheduler.acquire(self.priority, self.handle)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.scheduler.release()
+        return False
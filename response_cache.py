@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Response Cache for AskForHelp Chatbot
+
+Stores answers on disk (SQLite) so that repeated questions such as
+"printer not printing" are answered instantly instead of running the model
+again. Implements PERFORMANCE_SETTINGS["cache_responses"] in
+model_behavior_config.py.
+
+Entries are keyed on the normalized question text, the model name and the
+generation parameters. Old entries expire after a TTL, and the least recently
+used entries are removed once the cache is full.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+
+def normalize_question(question):
+    """Normalize a question so trivial differences (case, spacing, punctuation) still match"""
+    text = question.lower().strip()
+    text = re.sub(r"\s+", " ", text)
+    return text.rstrip(" ?!.")
+
+
+def make_cache_key(question, model, params):
+    """Build the cache key for a question, model and generation parameters"""
+    key_data = json.dumps(
+        [normalize_question(question), model, params],
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(key_data.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """On-disk question/answer cache with LRU and TTL eviction"""
+
+    def __init__(self, path, max_entries=5000, ttl_hours=168):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_hours * 3600
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        # One connection shared by the UI and worker threads (guarded by the lock)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)")
+        self.db.commit()
+
+    def get(self, question, model, params):
+        """Get a cached answer, or None on a miss"""
+        key = make_cache_key(question, model, params)
+        now = time.time()
+
+        with self.lock:
+            row = self.db.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and now - row[1] > self.ttl_seconds:
+                self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.db.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.db.execute(
+                "UPDATE responses SET last_access = ?, hit_count = hit_count + 1 WHERE key = ?",
+                (now, key)
+            )
+            self.db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, question, model, params, response):
+        """Store an answer and evict expired and least recently used entries"""
+        key = make_cache_key(question, model, params)
+        now = time.time()
+
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, question, model, response, created_at, last_access, hit_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (key, normalize_question(question), model, response, now, now)
+            )
+            self.db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+
+            count = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self.db.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+            self.db.commit()
+
+    def clear(self):
+        """Remove all cached answers"""
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self.lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": entries,
+                "max_entries": self.max_entries,
+            }
+
+    def close(self):
+        """Close the database"""
+        with self.lock:
+            self.db.close()
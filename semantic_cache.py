@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Semantic Cache for AskForHelp Chatbot
+
+Answers questions that mean the same thing as an earlier question
+("wifi keeps dropping" / "my wireless disconnects") from the earlier answer.
+Questions are turned into embedding vectors and compared by cosine
+similarity against an in-memory index of previous questions.
+
+Embedders:
+- OllamaEmbedder: uses Ollama's /api/embed endpoint (e.g. nomic-embed-text)
+- HashingEmbedder: deterministic word/character hashing, no model needed
+  (useful for testing and benchmarking)
+
+Requires NumPy; when NumPy is not installed the semantic cache is disabled.
+"""
+
+import json
+import re
+import threading
+import zlib
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def is_available():
+    """Check whether the semantic cache can be used (NumPy installed)"""
+    return np is not None
+
+
+class OllamaEmbedder:
+    """Embeds text with an Ollama embedding model"""
+
+    def __init__(self, client, model):
+        self.client = client
+        self.model = model
+
+    def embed(self, texts):
+        """Embed a list of texts, returning one vector per text"""
+        response = self.client.embed({"model": self.model, "input": list(texts)})
+        response.raise_for_status()
+        return np.asarray(response.json()['embeddings'], dtype=np.float32)
+
+
+class HashingEmbedder:
+    """Deterministic stand-in embedder based on hashed words and character trigrams"""
+
+    def __init__(self, dimensions=256):
+        self.dimensions = dimensions
+
+    def features(self, text):
+        """Words plus character trigrams of each word"""
+        words = re.findall(r"\w+", text.lower())
+        features = list(words)
+        for word in words:
+            padded = f"#{word}#"
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        return features
+
+    def embed(self, texts):
+        """Embed a list of texts, returning one vector per text"""
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self.features(text):
+                digest = zlib.crc32(feature.encode('utf-8'))
+                sign = 1.0 if digest & 1 else -1.0
+                vectors[row, (digest >> 1) % self.dimensions] += sign
+        return vectors
+
+
+class VectorIndex:
+    """Fixed-capacity vector index with batched cosine top-k search
+
+    Vectors are stored normalized in one preallocated matrix, so memory is
+    bounded by capacity * dimensions. When full, the oldest entry is replaced.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.vectors = None
+        self.payloads = [None] * capacity
+        self.size = 0
+        self.next_slot = 0
+
+    def add(self, vector, payload):
+        """Add one vector with its payload"""
+        vector = normalize_rows(np.asarray(vector, dtype=np.float32).reshape(1, -1))[0]
+        if self.vectors is None:
+            self.vectors = np.zeros((self.capacity, vector.shape[0]), dtype=np.float32)
+
+        self.vectors[self.next_slot] = vector
+        self.payloads[self.next_slot] = payload
+        self.next_slot = (self.next_slot + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def search(self, queries, k=5):
+        """Find the k most similar entries for each query vector
+
+        Returns one list of (similarity, payload) per query, best first.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.size == 0:
+            return [[] for _ in range(len(queries))]
+
+        scores = normalize_rows(queries) @ self.vectors[:self.size].T
+        k = min(k, self.size)
+
+        results = []
+        for row in scores:
+            top = np.argpartition(row, -k)[-k:]
+            top = top[np.argsort(row[top])[::-1]]
+            results.append([(float(row[i]), self.payloads[i]) for i in top])
+        return results
+
+
+def normalize_rows(vectors):
+    """Scale each row to unit length"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def make_partition(model, params):
+    """Key of the answers that can be reused: same model and generation parameters"""
+    return json.dumps([model, params], sort_keys=True, default=str)
+
+
+class SemanticCache:
+    """Answers questions that are similar enough to an earlier question"""
+
+    def __init__(self, embedder, threshold=0.92, max_entries=20000):
+        self.embedder = embedder
+        self.threshold = threshold
+        self.index = VectorIndex(max_entries)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup_many(self, questions, model, params=None, k=5):
+        """Look up several questions at once
+
+        Only answers generated with the same model and parameters (preset,
+        prompt template...) are returned, like the exact response cache.
+        Returns a list of (response or None, vector); the vector can be passed
+        to add() so the question doesn't have to be embedded twice.
+        """
+        partition = make_partition(model, params)
+        vectors = self.embedder.embed(questions)
+
+        with self.lock:
+            matches = self.index.search(vectors, k=k)
+
+        results = []
+        for vector, candidates in zip(vectors, matches):
+            response = None
+            for score, payload in candidates:
+                if score < self.threshold:
+                    break
+                if payload["partition"] == partition:
+                    response = payload["response"]
+                    break
+
+            with self.lock:
+                if response is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            results.append((response, vector))
+        return results
+
+    def lookup(self, question, model, params=None):
+        """Look up one question, returning (response or None, vector)"""
+        return self.lookup_many([question], model, params)[0]
+
+    def add(self, question, model, response, vector=None, params=None):
+        """Remember the answer to a question"""
+        if vector is None:
+            vector = self.embedder.embed([question])[0]
+        payload = {"question": question, "partition": make_partition(model, params), "response": response}
+        with self.lock:
+            self.index.add(vector, payload)
+
+    def stats(self):
+        """Hit/miss counters and current size"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": self.index.size,
+                "max_entries": self.index.capacity,
+            }
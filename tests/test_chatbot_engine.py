@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Engine event tests for AskForHelp Chatbot
+
+Runs ChatbotEngine.query_ai without the window against a port nothing
+listens on and against the fake Ollama server, and checks the events the
+window would receive.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import fake_ollama
+import model_behavior_config
+import model_config
+from chatbot_engine import ChatbotEngine
+
+
+def get_refused_url():
+    """URL of a local port that refuses connections"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}/api/generate"
+
+
+class EngineEventsTest(unittest.TestCase):
+    """Events sent by query_ai when the answer can't be generated"""
+
+    def setUp(self):
+        self.saved = {name: getattr(model_config, name)
+                      for name in ("OLLAMA_URL", "OLLAMA_URLS", "HEALTH_CHECK_INTERVAL", "HEDGING",
+                                   "STREAM_RESPONSES")}
+        self.saved_log_file = model_behavior_config.LOG_FILE
+        self.log_dir = tempfile.TemporaryDirectory()
+        model_behavior_config.LOG_FILE = os.path.join(self.log_dir.name, "events.jsonl")
+        model_config.OLLAMA_URLS = []
+        model_config.HEALTH_CHECK_INTERVAL = 0
+        self.server = None
+        self.engine = None
+
+    def tearDown(self):
+        if self.engine is not None:
+            self.engine.close()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        for name, value in self.saved.items():
+            setattr(model_config, name, value)
+        model_behavior_config.LOG_FILE = self.saved_log_file
+        self.log_dir.cleanup()
+
+    def start_fake_server(self):
+        """Run the fake Ollama server on a free port; returns its generate URL"""
+        args = fake_ollama.get_parser().parse_args(
+            ["--port", "0", "--load-ms", "0", "--token-ms", "1", "--answer-tokens", "5"])
+        self.server = fake_ollama.create_server(args)
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api/generate"
+
+    def ask(self, url, question="My printer is not working", model=None):
+        """Ask one question; returns (answer, metrics, event names)"""
+        model_config.OLLAMA_URL = url
+        self.engine = ChatbotEngine()
+        self.engine.response_cache = None
+        self.engine.semantic_cache = None
+        if model:
+            self.engine.model = model
+
+        events = []
+        self.engine.subscribe(lambda event, data: events.append(event))
+        answer, metrics = self.engine.query_ai(question, [])
+        return answer, metrics, events
+
+    def test_refused_connection_starts_no_answer(self):
+        answer, metrics, events = self.ask(get_refused_url())
+
+        self.assertNotIn("answer_start", events)
+        self.assertNotIn("answer_end", events)
+        self.assertIn("error", events)
+        self.assertEqual(metrics.values["source"], "offline")
+        self.assertTrue(answer)
+
+    def test_refused_connection_with_hedging_starts_no_answer(self):
+        model_config.HEDGING = dict(model_config.HEDGING, enabled=True, first_token_deadline=0.1,
+                                    fallback_model="tiny:1b")
+        answer, metrics, events = self.ask(get_refused_url())
+
+        self.assertNotIn("answer_start", events)
+        self.assertIn("error", events)
+
+    def test_unknown_model_starts_no_answer(self):
+        answer, metrics, events = self.ask(self.start_fake_server(), model="missing:7b")
+
+        self.assertNotIn("answer_start", events)
+        self.assertIn("error", events)
+        self.assertEqual(metrics.values["source"], "error")
+
+    def test_streamed_answer(self):
+        answer, metrics, events = self.ask(self.start_fake_server())
+
+        self.assertEqual(events.count("answer_start"), 1)
+        self.assertLess(events.index("answer_start"), events.index("answer_token"))
+        self.assertLess(events.index("answer_token"), events.index("answer_end"))
+        self.assertEqual(metrics.values["source"], "model")
+        self.assertTrue(answer)
+
+    def test_answer_without_live_streaming(self):
+        # Ollama still streams; the answer is only shown once it is complete
+        model_config.STREAM_RESPONSES = False
+        answer, metrics, events = self.ask(self.start_fake_server())
+
+        self.assertNotIn("answer_start", events)
+        self.assertEqual(events.count("answer"), 1)
+        self.assertLess(metrics.values["ttft_ms"], metrics.values["total_ms"])
+        self.assertTrue(answer)
+
+
+if __name__ == "__main__":
+    unittest.main()